@@ -1,18 +1,26 @@
-from datetime import datetime
+import csv
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from itertools import chain
+from urllib.parse import urlencode
 
 from django.contrib import admin
-from django.db.models import Case, Count, DecimalField, F, Sum, When
+from django.db.models import Count, F, Q, Sum
 from django.forms import ModelForm
-from django.http import HttpRequest
+from django.http import HttpRequest, StreamingHttpResponse
 from django.template.response import TemplateResponse
-from django.utils.timezone import now
+from django.utils.timezone import localtime, now
 
 from codes.models import Giftcard, StockbleCode, UcCode
+from codes.selection import unexpired
 from items.models import Item
-from orders.models import Order
+from orders.models import DailySalesRollup, Order
+from orders.rollups import get_day_range, with_buying_cost
 
 from .models import Attachment, DailyReport, Mailing, ManagerChat, ProfitReport
 
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
 
 @admin.register(ManagerChat)
 class ManagerChatAdmin(admin.ModelAdmin):
@@ -36,6 +44,18 @@ class AttachmentInlineAdmin(admin.TabularInline):
 @admin.register(Mailing)
 class MailingAdmin(admin.ModelAdmin):
     inlines = (AttachmentInlineAdmin,)
+    list_display = (
+        "__str__",
+        "date_time",
+        "is_sent",
+        "delivered_count",
+        "failed_count",
+    )
+    readonly_fields = (
+        "last_user_id",
+        "delivered_count",
+        "failed_count",
+    )
 
     def save_form(self, request: HttpRequest, form: ModelForm, change: bool):
         return super().save_form(request, form, change)
@@ -55,29 +75,33 @@ class DailyReportAdmin(admin.ModelAdmin):
             report_date = now().date()
 
         uc_sold_today = (
-            UcCode.objects.filter(order__created_at__date=report_date)
+            UcCode.objects.filter(
+                **get_day_range(report_date, field="order__created_at")
+            )
             .values("amount")
             .annotate(count=Count("id"))
             .order_by("amount")
         )
 
         uc_remaining_stock = (
-            UcCode.objects.filter(order__isnull=True)
+            UcCode.objects.filter(unexpired(), order__isnull=True)
             .values("amount")
             .annotate(count=Count("id"))
             .order_by("amount")
         )
 
         uc_added_today = (
-            UcCode.objects.filter(created_at__date=report_date)
+            UcCode.objects.filter(**get_day_range(report_date))
             .values("amount")
             .annotate(count=Count("id"))
             .order_by("amount")
         )
 
         daily_orders = (
+            # Те же заказы, что входят в дневные итоги sold_codes_summary
             Order.objects.filter(
-                created_at__date=report_date,
+                **get_day_range(report_date),
+                status=Order.Status.COMPLETED,
                 category__in=[Item.Category.GIFTCARD, Item.Category.CODES],
             )
             .select_related("tg_user", "item")
@@ -85,19 +109,23 @@ class DailyReportAdmin(admin.ModelAdmin):
         )
 
         sold_codes_summary = (
-            daily_orders.values("item__title", "item__amount")
+            DailySalesRollup.objects.filter(
+                day=report_date,
+                category__in=[Item.Category.GIFTCARD, Item.Category.CODES],
+            )
+            .values("item__title", "item__amount")
             .annotate(total_sold=Sum("quantity"))
             .order_by("item__title")
         )
 
         giftcards_added_today = (
-            Giftcard.objects.filter(created_at__date=report_date)
+            Giftcard.objects.filter(**get_day_range(report_date))
             .values("item__title")
             .annotate(count=Count("id"))
         )
 
         stockblecodes_added_today = (
-            StockbleCode.objects.filter(created_at__date=report_date)
+            StockbleCode.objects.filter(**get_day_range(report_date))
             .values("amount")
             .annotate(count=Count("id"))
         )
@@ -119,9 +147,80 @@ class DailyReportAdmin(admin.ModelAdmin):
         return TemplateResponse(request, self.change_list_template, context)
 
 
+class Echo:
+    """Псевдо-буфер для csv.writer: строки сразу уходят в StreamingHttpResponse."""
+
+    def write(self, value):
+        return value
+
+
 @admin.register(ProfitReport)
 class ProfitReportAdmin(admin.ModelAdmin):
     change_list_template = "admin/profit_report.html"
+    page_size = 100
+    export_chunk_size = 2000
+    export_fields = (
+        "id",
+        "created_at",
+        "tg_user__tg_id",
+        "tg_user__username",
+        "item__title",
+        "quantity",
+        "price",
+        "total_buying_cost",
+        "net_profit",
+    )
+
+    @staticmethod
+    def get_cursor(order: Order) -> str:
+        return f"{(order.created_at - EPOCH) // timedelta(microseconds=1)}_{order.id}"
+
+    def get_page(self, orders, cursor: str | None, is_newer: bool):
+        """Keyset-страница по (created_at, id) от новых к старым."""
+        try:
+            micros, order_id = map(int, cursor.split("_"))
+        except (AttributeError, ValueError):
+            cursor = None
+        if cursor:
+            created_at = EPOCH + timedelta(microseconds=micros)
+            if is_newer:
+                orders = orders.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=order_id)
+                )
+            else:
+                orders = orders.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id)
+                )
+        if is_newer:
+            orders = orders.order_by("created_at", "id")
+        else:
+            orders = orders.order_by("-created_at", "-id")
+        page = list(orders[: self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[: self.page_size]
+        if is_newer:
+            page.reverse()
+        has_older = has_more if not is_newer else bool(cursor)
+        has_newer = has_more if is_newer else bool(cursor)
+        return page, has_older, has_newer
+
+    def export_csv(self, orders, filename: str):
+        rows = (
+            orders.order_by("-created_at", "-id")
+            .values_list(*self.export_fields)
+            .iterator(chunk_size=self.export_chunk_size)
+        )
+        writer = csv.writer(Echo())
+        lines = (
+            writer.writerow((order_id, localtime(created_at).isoformat(), *rest))
+            for order_id, created_at, *rest in rows
+        )
+        response = StreamingHttpResponse(
+            chain([writer.writerow(self.export_fields)], lines),
+            content_type="text/csv",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
     def changelist_view(self, request, extra_context=None):
         context = self.admin_site.each_context(request)
@@ -137,59 +236,57 @@ class ProfitReportAdmin(admin.ModelAdmin):
             start_date = today
             end_date = today
 
-
-        code_based_buying_cost = Sum(
-            Case(
-                When(category=Item.Category.PUBG_UC, then=F("uc_codes__buying_cost")),
-                When(
-                    category=Item.Category.CODES, then=F("stockble_codes__buying_cost")
-                ),
-                When(
-                    category=Item.Category.GIFTCARD,
-                    then=F("giftcard_codes__buying_cost"),
-                ),
-                default=0,
-                output_field=DecimalField(),
-            )
-        )
-
-        manual_buying_cost = F("item__buying_cost") * F("quantity")
-
         orders = (
-            Order.objects.filter(
-                created_at__date__range=[start_date, end_date],
-                is_completed=True,
-            )
-            .annotate(
-                total_buying_cost=Case(
-                    When(
-                        category__in=[
-                            Item.Category.PUBG_UC,
-                            Item.Category.CODES,
-                            Item.Category.GIFTCARD,
-                        ],
-                        then=code_based_buying_cost,
-                    ),
-                    default=manual_buying_cost,
-                    output_field=DecimalField(),
+            with_buying_cost(
+                Order.objects.filter(
+                    **get_day_range(start_date, end_date),
+                    status=Order.Status.COMPLETED,
                 )
             )
-            .filter(
-                total_buying_cost__isnull=False
-            )
+            .filter(total_buying_cost__isnull=False)
             .annotate(net_profit=F("price") - F("total_buying_cost"))
-            .select_related("tg_user", "item")
-            .order_by("-created_at")
         )
 
-        total_profit = orders.aggregate(total=Sum("net_profit"))["total"] or 0
+        if request.GET.get("export") == "csv":
+            return self.export_csv(
+                orders, f"profit_{start_date:%Y-%m-%d}_{end_date:%Y-%m-%d}.csv"
+            )
+
+        page, has_older, has_newer = self.get_page(
+            orders.select_related("tg_user", "item"),
+            request.GET.get("cursor"),
+            request.GET.get("direction") == "newer",
+        )
+        dates = {"start_date": start_date_str, "end_date": end_date_str}
+
+        total_profit = (
+            DailySalesRollup.objects.filter(
+                day__range=(start_date, end_date)
+            ).aggregate(total=Sum("profit"))["total"]
+            or 0
+        )
 
         report_data = {
             "title": "Profit Report",
             "start_date_str": start_date_str,
             "end_date_str": end_date_str,
-            "orders_with_profit": orders,
+            "orders_with_profit": page,
             "total_profit": total_profit,
+            "export_url": f"?{urlencode({**dates, 'export': 'csv'})}",
+            # Курсор из устаревшей ссылки может дать пустую страницу
+            "older_url": (
+                f"?{urlencode({**dates, 'cursor': self.get_cursor(page[-1])})}"
+                if has_older and page
+                else None
+            ),
+            "newer_url": (
+                "?"
+                + urlencode(
+                    {**dates, "cursor": self.get_cursor(page[0]), "direction": "newer"}
+                )
+                if has_newer and page
+                else None
+            ),
         }
         context.update(report_data)
 
@@ -14,10 +14,17 @@ from admin_panel.tasks import send_daily_summary
 from backend.tasks import start_background_tasks
 from bot.commands import set_commands
 from bot.handlers import admin_router, profile_router, shop_router, start_router, freefire_router
+from bot.middlewares import DeliveryStateMiddleware
 from bot.misc.logging import configure_logger
 from bot.misc.mailing import start_mailing
+from codes.archive import schedule_codes_archiving
+from codes.importer import schedule_import_jobs_recovery
+from codes.ledger import schedule_stock_reconcile
+from orders.outbox import schedule_order_events_relay
 from orders.utils import delete_old_topups
 from payments.payment import check_wallets
+from payments.webhooks import schedule_webhook_events_processing
+from users.ledger import schedule_balance_compaction
 
 ENV = settings.ENV
 REDIS_HOST = ENV.str("REDIS_HOST")
@@ -38,6 +45,7 @@ async def main():
     storage = RedisStorage.from_url(f"redis://{REDIS_HOST}:{REDIS_PORT}/0")
 
     dp = Dispatcher(storage=storage)
+    dp.update.outer_middleware(DeliveryStateMiddleware())
     dp.include_routers(
         start_router,
         admin_router,
@@ -66,6 +74,28 @@ async def main():
         id="delete_old_topups",
     )
 
+    scheduler.add_job(
+        schedule_order_events_relay,
+        "interval",
+        name="order events relay",
+        misfire_grace_time=10,
+        max_instances=1,
+        minutes=1,
+        replace_existing=True,
+        id="relay_order_events",
+    )
+
+    scheduler.add_job(
+        schedule_webhook_events_processing,
+        "interval",
+        name="webhook events processing",
+        misfire_grace_time=10,
+        max_instances=1,
+        minutes=1,
+        replace_existing=True,
+        id="process_webhook_events",
+    )
+
     scheduler.add_job(
         check_wallets,
         "interval",
@@ -110,6 +140,52 @@ async def main():
         id="send_daily_summary",
     )
 
+    scheduler.add_job(
+        schedule_stock_reconcile,
+        "interval",
+        name="stock ledger reconcile",
+        misfire_grace_time=10,
+        max_instances=1,
+        minutes=10,
+        replace_existing=True,
+        id="reconcile_stock",
+    )
+
+    scheduler.add_job(
+        schedule_import_jobs_recovery,
+        "interval",
+        name="stuck code imports recovery",
+        misfire_grace_time=10,
+        max_instances=1,
+        minutes=10,
+        replace_existing=True,
+        id="recover_import_jobs",
+    )
+
+    scheduler.add_job(
+        schedule_codes_archiving,
+        "cron",
+        hour=4,
+        minute=0,
+        name="consumed codes archiving",
+        misfire_grace_time=60,
+        max_instances=1,
+        replace_existing=True,
+        id="archive_codes",
+    )
+
+    scheduler.add_job(
+        schedule_balance_compaction,
+        "cron",
+        hour=3,
+        minute=30,
+        name="balance ledger compaction",
+        misfire_grace_time=60,
+        max_instances=1,
+        replace_existing=True,
+        id="compact_balances",
+    )
+
     scheduler.start()
     scheduler.print_jobs()
 
@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-19 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0006_profitreport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailing',
+            name='delivered_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Delivered'),
+        ),
+        migrations.AddField(
+            model_name='mailing',
+            name='failed_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Failed'),
+        ),
+        migrations.AddField(
+            model_name='mailing',
+            name='last_user_id',
+            field=models.PositiveBigIntegerField(default=0, help_text='Id of the last processed user. Mailing resumes after it', verbose_name='Cursor'),
+        ),
+    ]
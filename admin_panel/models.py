@@ -20,6 +20,13 @@ class Mailing(models.Model):
     is_sent = models.BooleanField(
         help_text="sending status", verbose_name="sending status", default=False
     )
+    last_user_id = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Id of the last processed user. Mailing resumes after it",
+        verbose_name="Cursor",
+    )
+    delivered_count = models.PositiveIntegerField(default=0, verbose_name="Delivered")
+    failed_count = models.PositiveIntegerField(default=0, verbose_name="Failed")
 
     class Meta:
         verbose_name = "Mailing"
@@ -4,70 +4,33 @@ from datetime import date
 from aiogram import Bot
 from aiogram.enums import ParseMode
 from asgiref.sync import sync_to_async
-from django.db.models import Case, Count, DecimalField, F, Sum, When
+from django.db.models import Sum
 from django.utils.timezone import now
 
 from backend.config import URL_CONFIG
-from items.models import Item
-from orders.models import Order
+from orders.models import DailySalesRollup
 
 logger = logging.getLogger(__name__)
 
 
 @sync_to_async
 def get_daily_summary_data(report_date: date):
-    code_based_buying_cost = Sum(
-        Case(
-            When(category=Item.Category.PUBG_UC, then=F("uc_codes__buying_cost")),
-            When(category=Item.Category.CODES, then=F("stockble_codes__buying_cost")),
-            When(
-                category=Item.Category.GIFTCARD, then=F("giftcard_codes__buying_cost")
-            ),
-            default=0,
-            output_field=DecimalField(),
-        )
-    )
-    manual_buying_cost = F("item__buying_cost") * F("quantity")
-
-    orders = Order.objects.filter(
-        created_at__date=report_date, is_completed=True
-    ).annotate(
-        total_buying_cost=Case(
-            When(
-                category__in=[
-                    Item.Category.PUBG_UC,
-                    Item.Category.CODES,
-                    Item.Category.GIFTCARD,
-                ],
-                then=code_based_buying_cost,
-            ),
-            default=manual_buying_cost,
-            output_field=DecimalField(),
-        )
+    rollups = DailySalesRollup.objects.filter(day=report_date)
+    totals = rollups.aggregate(
+        total_orders=Sum("orders"),
+        total_turnover=Sum("turnover"),
+        total_profit=Sum("profit"),
     )
-
-    orders_with_profit = orders.filter(total_buying_cost__isnull=False)
-
-    total_orders = orders.count()
-    total_turnover = orders.aggregate(total=Sum("price"))["total"] or 0
-    total_profit = (
-        orders_with_profit.aggregate(profit=Sum(F("price") - F("total_buying_cost")))[
-            "profit"
-        ]
-        or 0
-    )
-
     top_products = (
-        Order.objects.filter(created_at__date=report_date, is_completed=True)
-        .values("item__title", "item__amount")
-        .annotate(count=Count("id"))
+        rollups.values("item__title", "item__amount")
+        .annotate(count=Sum("orders"))
         .order_by("-count")[:3]
     )
 
     return {
-        "total_orders": total_orders,
-        "total_turnover": total_turnover,
-        "total_profit": total_profit,
+        "total_orders": totals["total_orders"] or 0,
+        "total_turnover": totals["total_turnover"] or 0,
+        "total_profit": totals["total_profit"] or 0,
         "top_products": list(top_products),
     }
 
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+
+class ProfitReportAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", password="admin")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_stale_cursor_renders_empty_page(self):
+        url = reverse("admin:admin_panel_profitreport_changelist")
+        for direction in ("older", "newer"):
+            with self.subTest(direction=direction):
+                response = self.client.get(
+                    url, {"cursor": "1_1", "direction": direction}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context["orders_with_profit"]), [])
@@ -3,6 +3,7 @@ from decimal import Decimal
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
+from codes.recipes import StockSnapshot
 from items.models import FreeFireRegionPrice, Item, PUBGUCItem
 from orders.models import Order, TopUp
 from users.models import TgUser
@@ -23,7 +24,10 @@ class ProductSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.IntegerField(allow_null=True))
     def get_stock(self, obj: Item):
-        return obj.get_stock_amount()
+        # Снимок склада общий для всех товаров в ответе
+        if "stock_snapshot" not in self.context:
+            self.context["stock_snapshot"] = StockSnapshot.from_ledger()
+        return obj.get_stock_amount(self.context["stock_snapshot"])
 
 
 class FreeFireProductSerializer(serializers.ModelSerializer):
@@ -4,7 +4,12 @@ from enum import Enum
 from django.conf import settings
 from liveconfigs.models import BaseConfig
 
-from .validators import validate_telegram_html
+from .constants import CODE_SELECTION_POLICIES
+from .validators import (
+    validate_selection_policies,
+    validate_selection_policy,
+    validate_telegram_html,
+)
 
 logger = logging.getLogger()
 
@@ -131,6 +136,31 @@ class PAYMENT_CONFIG(BaseConfig):
     TOPUP_RUBLE_MAX_TAGS = [ConfigTags.payment]
 
 
+class CODES_CONFIG(BaseConfig):
+    __topic__ = "Codes configuration"
+
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_AFTER_DAYS_DESCRIPTION = (
+        "Codes of completed orders older than this number of days are moved to archive"
+    )
+    ARCHIVE_AFTER_DAYS_TAGS = [ConfigTags.other]
+
+    DEFAULT_SELECTION_POLICY: str = "fifo"
+    DEFAULT_SELECTION_POLICY_DESCRIPTION = (
+        f"Order in which free codes are reserved: {', '.join(CODE_SELECTION_POLICIES)}"
+    )
+    DEFAULT_SELECTION_POLICY_TAGS = [ConfigTags.other]
+    DEFAULT_SELECTION_POLICY_VALIDATORS = [validate_selection_policy]
+
+    SELECTION_POLICIES: dict[str, str] = {}
+    SELECTION_POLICIES_DESCRIPTION = (
+        'Selection policy overrides by code kind and nominal, e.g. {"uc:8100": "cheapest", '
+        '"stockble": "expiring", "giftcard": "most_expensive"}'
+    )
+    SELECTION_POLICIES_TAGS = [ConfigTags.other]
+    SELECTION_POLICIES_VALIDATORS = [validate_selection_policies]
+
+
 class FEATURES_CONFIG(BaseConfig):
     __topic__ = "Feature Flags"
 
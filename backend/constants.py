@@ -93,6 +93,13 @@ UC_RECIPES = {
     ],
 }
 
+CODE_SELECTION_POLICIES = {
+    "fifo": "Oldest first",
+    "cheapest": "Cheapest first",
+    "most_expensive": "Most expensive first",
+    "expiring": "Expiring first",
+}
+
 
 for code, code_list in CODES_MAP.items():
     assert code == sum(code_list), f"sum  {code_list} not equal to code {code}"
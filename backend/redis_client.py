@@ -0,0 +1,4 @@
+import redis
+from django.conf import settings
+
+redis_client = redis.Redis.from_url(settings.REDIS_STATE_URL, decode_responses=True)
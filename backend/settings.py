@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     "orders",
     "codes",
     "api",
+    "payments",
 ]
 
 MIDDLEWARE = [
@@ -131,6 +132,8 @@ MEDIA_URL = "/media/"
 
 STATIC_ROOT = BASE_DIR / "static"
 MEDIA_ROOT = BASE_DIR / "media/"
+# Файлы, которые нельзя раздавать через nginx (например, загруженные коды)
+PRIVATE_MEDIA_ROOT = BASE_DIR / "private/"
 LOGS_PATH = BASE_DIR / "logs"
 
 
@@ -153,3 +156,7 @@ LC_CACHE_TTL = 10
 CELERY_BROKER_URL = f"redis://{ENV.str('REDIS_HOST')}:6379/10"
 CELERY_RESULT_BACKEND = f"redis://{ENV.str('REDIS_HOST')}:6379/11"
 CELERY_TASK_TRACK_STARTED = True
+# Долгие импорты кодов не должны занимать основной воркер
+CELERY_TASK_ROUTES = {"codes.tasks.import_codes_task": {"queue": "imports"}}
+
+REDIS_STATE_URL = f"redis://{ENV.str('REDIS_HOST')}:6379/12"
@@ -0,0 +1,38 @@
+class TrackedFieldsMixin:
+    """
+    Запоминает значения tracked_fields, загруженные из БД,
+    чтобы сигналы видели переходы без повторного запроса старой строки.
+    """
+
+    tracked_fields: tuple[str, ...] = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_tracking()
+        return instance
+
+    def reset_tracking(self, fields=None):
+        if not hasattr(self, "_loaded_values"):
+            self._loaded_values = {}
+        deferred = self.get_deferred_fields()
+        for field in self.tracked_fields:
+            if field in deferred or (fields is not None and field not in fields):
+                continue
+            self._loaded_values[field] = getattr(self, field)
+
+    def get_previous(self, field: str, default=None):
+        """Значение поля на момент загрузки/последнего сохранения."""
+        return getattr(self, "_loaded_values", {}).get(field, default)
+
+    def has_changed(self, field: str) -> bool:
+        return self.get_previous(field) != getattr(self, field)
+
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        self.reset_tracking(kwargs.get("update_fields"))
+        return result
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        self.reset_tracking(fields)
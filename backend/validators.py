@@ -1,5 +1,7 @@
 import re
 
+from .constants import CODE_SELECTION_POLICIES
+
 
 def validate_telegram_html(text: str) -> bool:
     """
@@ -41,3 +43,12 @@ def validate_telegram_html(text: str) -> bool:
     if tag_stack:
         return False
     return True
+
+
+def validate_selection_policy(policy: str) -> bool:
+    return policy in CODE_SELECTION_POLICIES
+
+
+def validate_selection_policies(policies: dict) -> bool:
+    """Ключи вида "uc", "uc:8100", "stockble:60", "giftcard", значения из CODE_SELECTION_POLICIES."""
+    return all(map(validate_selection_policy, policies.values()))
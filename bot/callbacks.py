@@ -55,8 +55,14 @@ class HistoryCD(CallbackData, prefix="hstr"):
         WEEK = 7
         MONTH = 30
 
+    class Direction(StrEnum):
+        NEXT = "n"
+        PREVIOUS = "p"
+
     category: Category
-    page: int = 1
+    created_at: int | None = None
+    id: int | None = None
+    direction: Direction = Direction.NEXT
 
 
 class FolderCD(CallbackData, prefix="fldr"):
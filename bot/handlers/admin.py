@@ -25,8 +25,7 @@ async def make_order_completed(query: CallbackQuery, callback_data: OrderCD, sta
         logger.info(text)
         return
     order = await Order.objects.aget(id=callback_data.id)
-    order.is_completed = True
-    await order.asave(update_fields=('is_completed',))
+    await order.atransition(Order.Status.COMPLETED)
     text = f'{query.message.text}\n✅'
     await query.message.edit_text(text=text, reply_markup=None)
 
@@ -39,7 +38,7 @@ async def make_order_cancelled(query: CallbackQuery, callback_data: OrderCD, sta
         await query.answer(text)
         logger.info(text)
         return
-    order = await Order.objects.aget(id=callback_data.id)
+    order = await Order.objects.for_rendering().aget(id=callback_data.id)
     await order.acancel()
     text = f'{await order.aadmin_str()}'
     await query.message.edit_text(
@@ -1,4 +1,5 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 from decimal import Decimal
 
 from aiogram import F, Router
@@ -6,7 +7,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.db.models import Q
 from django.utils import timezone
 
 import bot.keyboards as kb
@@ -22,6 +23,19 @@ ENV = settings.ENV
 
 router = Router(name=__name__)
 
+HISTORY_PAGE_SIZE = 25
+HISTORY_FIELDS = (
+    "id",
+    "created_at",
+    "quantity",
+    "pubg_id",
+    "category",
+    "data",
+    "price",
+    "is_completed",
+)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
 
 @router.callback_query(MenuCD.filter(F.category == MenuCD.Category.profile))
 async def get_profile(query: CallbackQuery, callback_data: MenuCD, state: FSMContext):
@@ -43,18 +57,57 @@ async def get_history(query: CallbackQuery, callback_data: MenuCD, state: FSMCon
     )
 
 
+def get_history_cursor(
+    callback_data: HistoryCD, order: Order, direction: HistoryCD.Direction
+) -> HistoryCD:
+    return HistoryCD(
+        category=callback_data.category,
+        created_at=(order.created_at - EPOCH) // timedelta(microseconds=1),
+        id=order.id,
+        direction=direction,
+    )
+
+
+@sync_to_async
+def get_history_page(tg_id: int, callback_data: HistoryCD) -> tuple[list[Order], bool]:
+    """Страница истории по курсору (created_at, id). Второе значение: есть ли ещё записи."""
+    target_date = timezone.now() - timedelta(days=callback_data.category)
+    orders = Order.objects.filter(
+        tg_user__tg_id=tg_id, created_at__gte=target_date
+    ).only(*HISTORY_FIELDS)
+    is_previous = callback_data.direction == HistoryCD.Direction.PREVIOUS
+    if callback_data.id is not None:
+        created_at = EPOCH + timedelta(microseconds=callback_data.created_at)
+        if is_previous:
+            orders = orders.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=callback_data.id)
+            )
+        else:
+            orders = orders.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=callback_data.id)
+            )
+    if is_previous:
+        orders = orders.order_by("-created_at", "-id")
+    else:
+        orders = orders.order_by("created_at", "id")
+    page = list(orders[: HISTORY_PAGE_SIZE + 1])
+    has_more = len(page) > HISTORY_PAGE_SIZE
+    page = page[:HISTORY_PAGE_SIZE]
+    if is_previous:
+        page.reverse()
+    return page, has_more
+
+
 @router.callback_query(HistoryCD.filter(F.category))
 async def get_history_slice(
     query: CallbackQuery, callback_data: HistoryCD, state: FSMContext
 ):
-    tg_user = await TgUser.objects.aget(tg_id=query.from_user.id)
-    target_date = timezone.now() - timedelta(days=callback_data.category)
-    orders = await sync_to_async(
-        lambda: list(Order.objects.filter(tg_user=tg_user, created_at__gte=target_date))
-    )()
-    paginator = Paginator(orders, 25)
-    p = paginator.page(callback_data.page)
-    order_text = "\n".join([order.to_str() for order in p.object_list])
+    orders, has_more = await get_history_page(query.from_user.id, callback_data)
+    if callback_data.direction == HistoryCD.Direction.PREVIOUS:
+        has_previous, has_next = has_more, True
+    else:
+        has_previous, has_next = callback_data.id is not None, has_more
+    order_text = "\n".join([order.to_str() for order in orders])
     text = (
         f"There your orders history for last {callback_data.category} days:\n\n"
         f"{order_text}"
@@ -62,9 +115,18 @@ async def get_history_slice(
     await query.message.edit_text(
         text,
         reply_markup=await kb.get_paginated_inline(
-            p.has_previous(),
-            p.has_next(),
-            callback_data,
+            (
+                get_history_cursor(
+                    callback_data, orders[0], HistoryCD.Direction.PREVIOUS
+                )
+                if has_previous and orders
+                else None
+            ),
+            (
+                get_history_cursor(callback_data, orders[-1], HistoryCD.Direction.NEXT)
+                if has_next and orders
+                else None
+            ),
             back_to=ProfileCD(category=ProfileCD.Category.HISOTORY),
         ),
     )
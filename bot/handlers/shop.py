@@ -24,6 +24,7 @@ from items.models import (
     StockCodesItem,
 )
 from orders.models import Order
+from orders.services import OrderCreationError, aplace_order
 from orders.utils import get_user_zone_id
 from users.models import TgUser
 
@@ -209,7 +210,7 @@ async def get_item(query: CallbackQuery, callback_data: ItemCD, state: FSMContex
     item = await Item.objects.select_related("manual_category").aget(
         id=callback_data.id
     )
-    quantity = await item.aget_stock_amount()
+    quantity = await item.aget_available_amount()
     if quantity is not None and quantity < 1:
         await query.answer("Not available at the moment")
         return
@@ -317,7 +318,7 @@ async def get_quantity(message: Message, state: FSMContext):
     data = await state.get_data()
     id = data["id"]
     item = await Item.objects.aget(id=id)
-    if (in_stock := await item.aget_stock_amount()) < quantity:
+    if (in_stock := await item.aget_available_amount(quantity)) < quantity:
         await message.answer(f"Only {in_stock} {item} remains in stock")
         return
     await create_order(state, item, message=message)
@@ -350,48 +351,34 @@ async def create_order(
     quantity = data.get("quantity", 1)
     pubg_id = data.get("pubg_id") or data.get("username")
 
-    price = item.price * quantity
-    if price > tg_user.balance:
-        text = "You do not have enough balance"
+    # Сообщение заказа известно заранее, чтобы сохранить его вместе с заказом
+    if message:
+        order_message = await message.answer("Processing order…")
+    else:
+        order_message = query.message
+    try:
+        placed = await aplace_order(
+            tg_user=tg_user,
+            item=item,
+            quantity=quantity,
+            pubg_id=pubg_id,
+            message_id=order_message.message_id,
+        )
+    except OrderCreationError as e:
         if message:
-            await message.answer(text)
-        elif query:
-            await query.answer(text)
+            await order_message.edit_text(str(e))
+        else:
+            await query.answer(str(e))
         return
-    order = await Order.objects.acreate(
-        tg_user=tg_user,
-        item=item,
-        quantity=quantity,
-        data=item.to_dict(),
-        price=price,
-        category=item.category,
-        pubg_id=pubg_id,
-        balance_before=tg_user.balance,
-    )
-    await tg_user.arefresh_from_db()
-    text = f"Processing order…\n{await order.auser_str()}"
-    if message:
-        new_message = await message.answer(text)
-    elif query:
-        await query.message.edit_text(text, reply_markup=None)
-        new_message = query.message
-    order.message_id = new_message.message_id
-    await order.asave(update_fields=("message_id",))
+    order = placed.order
+    await order_message.edit_text(f"Processing order…\n{placed.text}", reply_markup=None)
     text = await sync_to_async(lambda: TEXT_CONFIG.MENU_MSG)()
-    if message:
-        await message.answer(text, reply_markup=await kb.get_menu_inline())
-    elif query:
-        await query.message.answer(text, reply_markup=await kb.get_menu_inline())
-    codes = await order.agrab_codes()
-    bot = message.bot if message else query.bot
-    if codes and len(codes) == order.quantity:
-        text = generate_codes_text(codes=codes, order=order)
-        if text:
-            await asend_text_or_txt(
-                bot, chat_id=message.from_user.id, text=text, order=order
-            )
-        order.is_completed = True
-        await order.asave(update_fields=("is_completed",))
-    if codes and len(codes) != order.quantity:
-        order.is_completed = False
-        await order.asave(update_fields=("is_completed",))
+    await order_message.answer(text, reply_markup=await kb.get_menu_inline())
+    if placed.codes:
+        await asend_text_or_txt(
+            order_message.bot,
+            chat_id=tg_user.tg_id,
+            text=generate_codes_text(codes=placed.codes, order=order),
+            order=order,
+        )
+        await order.atransition(Order.Status.COMPLETED)
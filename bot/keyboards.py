@@ -1,4 +1,3 @@
-import copy
 import typing
 from enum import StrEnum
 
@@ -6,6 +5,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from asgiref.sync import sync_to_async
 
 from backend.config import BUTT_CONFIG, FEATURES_CONFIG
+from codes.recipes import StockSnapshot
 from items.models import (
     DiamondItem,
     Folder,
@@ -117,10 +117,18 @@ async def get_more_pubg_services_inline():
     return markup.as_markup()
 
 
+async def get_stock_snapshot(items: list[Item]) -> StockSnapshot | None:
+    """Один снимок склада UC на всё меню вместо запроса на каждый товар."""
+    if any(item.category == Item.Category.PUBG_UC for item in items):
+        return await StockSnapshot.afrom_ledger()
+    return None
+
+
 async def get_items_inline(items: list[Item], callback_data=MenuCD(category="root")):
     markup = InlineKeyboardBuilder()
+    snapshot = await get_stock_snapshot(items)
     for item in items:
-        amount = await item.aget_stock_amount()
+        amount = await item.aget_stock_amount(snapshot)
         text = f"{item} {'| ' + str(amount) + ' items' if amount is not None else ''}"
         markup.button(
             text=text,
@@ -244,19 +252,15 @@ async def get_history_inline():
 
 
 async def get_paginated_inline(
-    has_previous: bool, has_next: bool, callback_data: HistoryCD, back_to
+    previous_cb: HistoryCD | None, next_cb: HistoryCD | None, back_to
 ):
     markup = InlineKeyboardBuilder()
-    if has_previous or has_next:
-        if has_previous:
-            prev_cb = copy.deepcopy(callback_data)
-            prev_cb.page -= 1
-            markup.button(text="<", callback_data=prev_cb)
+    if previous_cb or next_cb:
+        if previous_cb:
+            markup.button(text="<", callback_data=previous_cb)
         else:
             markup.button(text=" ", callback_data="blabla")
-        if has_next:
-            next_cb = copy.deepcopy(callback_data)
-            next_cb.page += 1
+        if next_cb:
             markup.button(text=">", callback_data=next_cb)
         else:
             markup.button(text=" ", callback_data="blabla")
@@ -273,8 +277,9 @@ async def get_folders_inline(category: str, folders: list[Folder], items: list[I
         markup.button(
             text=folder.title, callback_data=FolderCD(id=folder.id, category=category)
         )
+    snapshot = await get_stock_snapshot(items)
     for item in items:
-        amount = await item.aget_stock_amount()
+        amount = await item.aget_stock_amount(snapshot)
         text = f"{item} {'| ' + str(amount) + ' items' if amount is not None else ''}"
         markup.button(
             text=text,
@@ -0,0 +1,46 @@
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from users.models import TgUser
+
+# Пользователь, недавно отмеченный доступным, повторно не проверяется
+REACHABLE_CHECK_TTL = 5 * 60
+REACHABLE_CACHE_SIZE = 100_000
+
+
+class DeliveryStateMiddleware(BaseMiddleware):
+    """Пользователь, написавший боту, снова доступен для отправки сообщений."""
+
+    def __init__(self):
+        self.checked_at: dict[int, float] = {}
+
+    def should_check(self, tg_id: int, event: TelegramObject) -> bool:
+        # Разблокировка бота приходит как my_chat_member и проверяется всегда
+        if isinstance(event, Update) and event.my_chat_member:
+            return True
+        now = time.monotonic()
+        if now - self.checked_at.get(tg_id, -REACHABLE_CHECK_TTL) < REACHABLE_CHECK_TTL:
+            return False
+        if len(self.checked_at) >= REACHABLE_CACHE_SIZE:
+            self.checked_at = {
+                user_id: checked_at
+                for user_id, checked_at in self.checked_at.items()
+                if now - checked_at < REACHABLE_CHECK_TTL
+            }
+        self.checked_at[tg_id] = now
+        return True
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user and self.should_check(user.id, event):
+            # UPDATE затрагивает строку только при смене состояния
+            await TgUser.amark_reachable(user.id)
+        return await handler(event, data)
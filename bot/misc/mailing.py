@@ -1,51 +1,137 @@
-import logging
 import asyncio
+import logging
+from enum import StrEnum
 
 from aiogram import Bot, exceptions
 from aiogram.types import InputMediaDocument, InputMediaPhoto, InputMediaVideo
 from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 
 from admin_panel.models import Attachment, Mailing
+from bot.utils import get_delivery_state
 from users.models import TgUser
 
 logger = logging.getLogger(__name__)
 
+MAILING_CHUNK_SIZE = 1000
+# Telegram допускает ~30 сообщений в секунду в разные чаты
+MAILING_RATE_LIMIT = 25
 
-async def start_mailing(bot: Bot):
-    now = timezone.now()
+
+class DeliveryResult(StrEnum):
+    DELIVERED = "delivered"
+    FAILED = "failed"
+    BLOCKED = TgUser.DeliveryState.BLOCKED.value
+    DEACTIVATED = TgUser.DeliveryState.DEACTIVATED.value
+
+
+@sync_to_async
+def get_recipients_chunk(cursor: int) -> list[tuple[int, int]]:
+    return list(
+        TgUser.objects.filter(
+            id__gt=cursor, delivery_state=TgUser.DeliveryState.ACTIVE
+        )
+        .order_by("id")
+        .values_list("id", "tg_id")[:MAILING_CHUNK_SIZE]
+    )
+
+
+@sync_to_async
+def save_progress(
+    mailing: Mailing, cursor: int, results: list[DeliveryResult], recipients: list[int]
+):
+    delivered = results.count(DeliveryResult.DELIVERED)
+    with transaction.atomic():
+        for state in (TgUser.DeliveryState.BLOCKED, TgUser.DeliveryState.DEACTIVATED):
+            tg_ids = [
+                tg_id
+                for tg_id, result in zip(recipients, results)
+                if result == state
+            ]
+            if tg_ids:
+                TgUser.mark_unreachable(tg_ids, state)
+        Mailing.objects.filter(id=mailing.id).update(
+            last_user_id=cursor,
+            delivered_count=F("delivered_count") + delivered,
+            failed_count=F("failed_count") + len(results) - delivered,
+        )
+
+
+async def send_mailing_message(
+    bot: Bot, chat_id: int, text: str | None, media: list | None
+) -> DeliveryResult:
+    while True:
+        try:
+            if media:
+                await bot.send_media_group(chat_id=chat_id, media=media)
+            else:
+                await bot.send_message(chat_id=chat_id, text=text)
+            return DeliveryResult.DELIVERED
+        except exceptions.TelegramRetryAfter as e:
+            logger.warning(f"Flood limit is exceeded. Sleep {e.retry_after} seconds.")
+            await asyncio.sleep(e.retry_after)
+        except exceptions.TelegramForbiddenError as e:
+            logger.info(f"Seems like user {chat_id} has blocked the bot: {e}")
+            return DeliveryResult(get_delivery_state(e))
+        except exceptions.TelegramAPIError as e:
+            logger.error(f"Mailing message has not been delivered to {chat_id}: {e}")
+            return DeliveryResult.FAILED
+
+
+async def get_mailing_media(mailing: Mailing) -> list | None:
     input_media = {
         Attachment.FileType.DOCUMENT: InputMediaDocument,
         Attachment.FileType.PHOTO: InputMediaPhoto,
-        Attachment.FileType.VIDEO: InputMediaVideo
+        Attachment.FileType.VIDEO: InputMediaVideo,
     }
-    users = await sync_to_async(lambda: list(TgUser.objects.all()))()
-    mailings = await sync_to_async(lambda: list(Mailing.objects.filter(date_time__lte=now, is_sent=False)))()
+    attachments = await sync_to_async(
+        lambda: list(Attachment.objects.filter(mailing=mailing))
+    )()
+    if not attachments:
+        return None
+    media = [
+        input_media[attachment.file_type](media=attachment.file_id)
+        for attachment in attachments
+    ]
+    media[-1].caption = mailing.text
+    return media
+
+
+async def run_mailing(bot: Bot, mailing: Mailing):
+    media = await get_mailing_media(mailing)
+    cursor = mailing.last_user_id
+    loop = asyncio.get_running_loop()
+    while chunk := await get_recipients_chunk(cursor):
+        for i in range(0, len(chunk), MAILING_RATE_LIMIT):
+            batch = chunk[i:i + MAILING_RATE_LIMIT]
+            started_at = loop.time()
+            results = await asyncio.gather(
+                *(
+                    send_mailing_message(bot, tg_id, mailing.text, media)
+                    for _, tg_id in batch
+                )
+            )
+            cursor = batch[-1][0]
+            await save_progress(
+                mailing, cursor, results, [tg_id for _, tg_id in batch]
+            )
+            await asyncio.sleep(max(0, 1 - (loop.time() - started_at)))
+    mailing.is_sent = True
+    await mailing.asave(update_fields=("is_sent",))
+    await mailing.arefresh_from_db()
+    logger.info(
+        f"Mailing {mailing.id} finished. "
+        f"Delivered: {mailing.delivered_count}, failed: {mailing.failed_count}"
+    )
+
+
+async def start_mailing(bot: Bot):
+    now = timezone.now()
+    mailings = await sync_to_async(
+        lambda: list(Mailing.objects.filter(date_time__lte=now, is_sent=False))
+    )()
     for mailing in mailings:
-        await mailing.arefresh_from_db()
-        if mailing.is_sent:
-            continue
-        mailing.is_sent = True
-        await mailing.asave(update_fields=('is_sent',))
-        logger.info(f'Mailing {mailing.id} started')
-        attachments = await sync_to_async(lambda: list(Attachment.objects.filter(mailing=mailing)))()
-        users_ = list(users)
-        while users_:
-            try:
-                user = users_[-1]
-                if len(attachments) == 0:
-                    await bot.send_message(chat_id=user.tg_id, text=mailing.text)
-                elif len(attachments) > 0:
-                    att_list = [
-                        input_media[attachment.file_type](media=attachment.file_id) for attachment in attachments
-                    ]
-                    att_list[-1].caption = mailing.text
-                    await bot.send_media_group(chat_id=user.tg_id, media=att_list)
-                users_.pop()
-            except exceptions.TelegramRetryAfter as e:
-                logger.warning(f'Flood limit is exceeded. Sleep {e.retry_after} seconds.')
-                await asyncio.sleep(e.retry_after)
-            except (exceptions.TelegramForbiddenError, exceptions.TelegramBadRequest) as e:
-                users_.pop()
-                logger.error(f'Seems like user {user.username} {user.tg_id} has blocked the bot')
-                logger.error(f'{e}')
+        logger.info(f"Mailing {mailing.id} started from user #{mailing.last_user_id}")
+        await run_mailing(bot, mailing)
@@ -3,6 +3,7 @@ import logging
 from typing import TYPE_CHECKING, Union
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
 from aiogram.types import BufferedInputFile
 from asgiref.sync import async_to_sync, sync_to_async
 from django.utils import timezone
@@ -56,9 +57,18 @@ async def send_codes_to_user(bot: Bot, chat_id: int, codes: list[StockbleCode]):
             await bot.send_message(chat_id, text=f"There your codes:\n{text}")
 
 
+def get_delivery_state(error: TelegramForbiddenError) -> TgUser.DeliveryState:
+    if "deactivated" in error.message:
+        return TgUser.DeliveryState.DEACTIVATED
+    return TgUser.DeliveryState.BLOCKED
+
+
 async def asend_notification(
     chat_id: int, text: str, reply_markup=None, message_id=None
 ):
+    if await TgUser.ais_unreachable(chat_id):
+        logger.info(f"User {chat_id} is unreachable. Notification skipped")
+        return
     async with Bot(ENV.str("TG_TOKEN_BOT")) as bot:
         if message_id:
             try:
@@ -68,6 +78,9 @@ async def asend_notification(
                     message_id=message_id,
                     reply_markup=reply_markup,
                 )
+            except TelegramForbiddenError as e:
+                logger.error(f"Message has not been delivered to {chat_id}: {e}")
+                await TgUser.amark_unreachable([chat_id], get_delivery_state(e))
             except Exception as e:
                 logger.error(f"{e}")
                 logger.error(
@@ -77,6 +90,9 @@ async def asend_notification(
         else:
             try:
                 await bot.send_message(chat_id, text=text, reply_markup=reply_markup)
+            except TelegramForbiddenError as e:
+                logger.error(f"Message has not been delivered to {chat_id}: {e}")
+                await TgUser.amark_unreachable([chat_id], get_delivery_state(e))
             except Exception as e:
                 logger.error(f"Message has not been delivered to {chat_id}")
                 logger.error(f"{e}")
@@ -1,8 +1,17 @@
 from django.contrib import admin
+from django.db import transaction
 from django.urls import reverse
 
 from .forms import GiftCardImportForm, ImportForm, StockbleCodeImportForm
-from .models import ActivatorPriority, Giftcard, StockbleCode, UcCode
+from .ledger import adjust_stock_for_deleted
+from .models import (
+    ActivatorPriority,
+    ArchivedCode,
+    Giftcard,
+    ImportJob,
+    StockbleCode,
+    UcCode,
+)
 
 
 @admin.register(ActivatorPriority)
@@ -11,8 +20,22 @@ class ActivatorPriorityAdmin(admin.ModelAdmin):
     list_editable = ("order", "is_active")
 
 
+class StockLedgerAdminMixin:
+    """Удалённые в админке свободные коды списываются с остатков в Redis."""
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            adjust_stock_for_deleted(self.model.objects.filter(id=obj.id))
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            adjust_stock_for_deleted(queryset)
+            super().delete_queryset(request, queryset)
+
+
 @admin.register(UcCode)
-class UcCodeAdmin(admin.ModelAdmin):
+class UcCodeAdmin(StockLedgerAdminMixin, admin.ModelAdmin):
     change_list_template = "admin/custom_change_list.html"
     list_filter = (
         "amount",
@@ -44,7 +67,7 @@ class UcCodeAdmin(admin.ModelAdmin):
 
 
 @admin.register(StockbleCode)
-class StockbleCodeAdmin(admin.ModelAdmin):
+class StockbleCodeAdmin(StockLedgerAdminMixin, admin.ModelAdmin):
     list_display = (
         "code",
         "amount",
@@ -60,7 +83,7 @@ class StockbleCodeAdmin(admin.ModelAdmin):
 
 
 @admin.register(Giftcard)
-class GiftcardAdmin(admin.ModelAdmin):
+class GiftcardAdmin(StockLedgerAdminMixin, admin.ModelAdmin):
     list_display = (
         "item",
         "code",
@@ -74,3 +97,53 @@ class GiftcardAdmin(admin.ModelAdmin):
         extra_content["form"] = GiftCardImportForm
         extra_content["revese_url"] = reverse("import_giftcards")
         return super().changelist_view(request, extra_content)
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "kind",
+        "status",
+        "processed",
+        "inserted",
+        "duplicates",
+        "invalid",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("kind", "status")
+    fields = (
+        "kind",
+        "status",
+        "params",
+        "processed",
+        "inserted",
+        "duplicates",
+        "invalid",
+        "error",
+        "created_at",
+        "finished_at",
+    )
+    readonly_fields = fields
+    change_form_template = "admin/import_job_change_form.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedCode)
+class ArchivedCodeAdmin(admin.ModelAdmin):
+    list_display = ("code", "kind", "amount", "order", "created_at", "archived_at")
+    list_filter = ("kind",)
+    search_fields = ("code",)
+    list_select_related = ("order",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,69 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order
+
+from .models import AbstractCode, ArchivedCode, Giftcard, StockbleCode, UcCode
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVED_FIELDS = ("amount", "status", "activator", "is_success", "item_id")
+
+
+def to_archived(code: AbstractCode) -> ArchivedCode:
+    return ArchivedCode(
+        kind=code.kind,
+        code=code.code,
+        buying_cost=code.buying_cost,
+        order_id=code.order_id,
+        created_at=code.created_at,
+        **{
+            field: getattr(code, field)
+            for field in ARCHIVED_FIELDS
+            if hasattr(code, field)
+        },
+    )
+
+
+def archive_codes(days: int, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Переносит коды завершённых заказов старше days дней в архив.
+    Коды заказа переносятся целиком в одной транзакции, чтобы себестоимость
+    заказа всегда считалась либо по рабочей таблице, либо по архиву.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    archived = 0
+    for model in (UcCode, StockbleCode, Giftcard):
+        while True:
+            with transaction.atomic():
+                order_ids = list(
+                    model.objects.filter(
+                        order__status=Order.Status.COMPLETED,
+                        order__created_at__lt=cutoff,
+                    )
+                    .order_by("order_id")
+                    .values_list("order_id", flat=True)
+                    .distinct()[:batch_size]
+                )
+                if not order_ids:
+                    break
+                codes = list(
+                    model.objects.select_for_update().filter(order_id__in=order_ids)
+                )
+                ArchivedCode.objects.bulk_create(
+                    [to_archived(code) for code in codes], batch_size=1000
+                )
+                model.objects.filter(id__in=[code.id for code in codes]).delete()
+            archived += len(codes)
+    logger.info(f"Archived {archived} codes of orders completed before {cutoff}")
+    return archived
+
+
+async def schedule_codes_archiving():
+    from .tasks import archive_codes_task
+
+    archive_codes_task.delay()
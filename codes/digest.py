@@ -0,0 +1,48 @@
+import logging
+
+from backend.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+DIGEST_WINDOW = 60
+DIGEST_KEY = "activation_digest:{order_id}"
+DIGEST_SCHEDULED_KEY = "activation_digest:{order_id}:scheduled"
+
+
+def push_activation_result(order_id: int, line: str) -> bool:
+    """Буферизует результат активации. Возвращает True, если нужно запланировать отправку."""
+    key = DIGEST_KEY.format(order_id=order_id)
+    pipe = redis_client.pipeline()
+    pipe.rpush(key, line)
+    pipe.expire(key, DIGEST_WINDOW * 10)
+    pipe.set(
+        DIGEST_SCHEDULED_KEY.format(order_id=order_id), 1, nx=True, ex=DIGEST_WINDOW
+    )
+    *_, scheduled = pipe.execute()
+    return bool(scheduled)
+
+
+def pop_activation_results(order_id: int) -> list[str]:
+    key = DIGEST_KEY.format(order_id=order_id)
+    pipe = redis_client.pipeline()
+    pipe.lrange(key, 0, -1)
+    pipe.delete(key, DIGEST_SCHEDULED_KEY.format(order_id=order_id))
+    lines, _ = pipe.execute()
+    return lines
+
+
+def build_digest_messages(order_id: int, lines: list[str], limit: int = 3500):
+    succeeded = sum(1 for line in lines if line.startswith("✅"))
+    header = (
+        f"Order #{order_id} activation results: "
+        f"{succeeded} ✅ / {len(lines) - succeeded} ❗️\n"
+    )
+    messages = []
+    current = header
+    for line in lines:
+        if len(current) + len(line) + 1 > limit:
+            messages.append(current)
+            current = header
+        current += f"{line}\n"
+    messages.append(current)
+    return messages
@@ -1,95 +1,74 @@
-import string
-
 from django import forms
 from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
 
 from backend.constants import DEFAULT_SC_AMOUNTS, UC_AMOUNTS_FOR_IMPORT
 from items.models import GiftcardItem, Item
 
-MIN_CODE_LENGTH = 15
-
 
-class ImportForm(forms.Form):
-    amount = forms.ChoiceField(
-        label="UC amount", choices=UC_AMOUNTS_FOR_IMPORT, required=True
-    )
-    is_priority_use = forms.BooleanField(
-        required=False,
-        label="Priority Use",
-        help_text="Check this to mark these codes for priority use.",
-    )
+class BaseImportForm(forms.Form):
     price_of_codes = forms.DecimalField(
         label="Price of codes (per one)",
         required=False,
         help_text="Set the buying cost for each imported code.",
     )
+    expires_at = forms.DateTimeField(
+        label="Expiration date",
+        required=False,
+        help_text="Codes with the nearest date go first under the expiring policy.",
+    )
     codes = forms.CharField(
-        min_length=1,
         max_length=100_000 * 20,
-        required=True,
+        required=False,
         widget=forms.Textarea,
         help_text="Input codes separated by space or line break",
     )
+    file = forms.FileField(
+        required=False,
+        label="Codes file",
+        help_text="Text file with codes separated by space or line break",
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if bool(cleaned_data.get("codes")) == bool(cleaned_data.get("file")):
+            raise ValidationError("Input codes or upload a file, not both")
+        return cleaned_data
+
+    def get_file(self):
+        """Файл с кодами для фонового импорта."""
+        if file := self.cleaned_data.get("file"):
+            return file
+        return ContentFile(self.cleaned_data["codes"].encode(), name="codes.txt")
+
+
+class ImportForm(BaseImportForm):
+    amount = forms.ChoiceField(
+        label="UC amount", choices=UC_AMOUNTS_FOR_IMPORT, required=True
+    )
+    is_priority_use = forms.BooleanField(
+        required=False,
+        label="Priority Use",
+        help_text="Check this to mark these codes for priority use.",
+    )
 
-    def clean_codes(self):
-        codes = self.cleaned_data["codes"].split()
-        for code in codes:
-            if len(code) < MIN_CODE_LENGTH:
-                raise ValidationError(f'Too short code: "{code}"')
-            characters = string.ascii_letters + string.digits
-            if any(char not in characters for char in code):
-                raise ValidationError(f'Code has not valid symbols: "{code}"')
-        return codes
+    field_order = ("amount", "is_priority_use")
 
 
-class GiftCardImportForm(forms.Form):
+class GiftCardImportForm(BaseImportForm):
     item = forms.ModelChoiceField(
         queryset=GiftcardItem.objects.filter(category=Item.Category.GIFTCARD),
         required=True,
         widget=forms.Select,
         help_text="Select a giftcard item",
     )
-    price_of_codes = forms.DecimalField(
-        label="Price of codes (per one)",
-        required=False,
-        help_text="Set the buying cost for each imported code.",
-    )
-    codes = forms.CharField(
-        min_length=1,
-        max_length=100_000 * 20,
-        required=True,
-        widget=forms.Textarea,
-        help_text="Input codes separated by space or line break",
-    )
 
-    def clean_codes(self):
-        codes = self.cleaned_data["codes"].split()
-        return codes
+    field_order = ("item",)
 
 
-class StockbleCodeImportForm(forms.Form):
+class StockbleCodeImportForm(BaseImportForm):
     amount = forms.ChoiceField(
         label="UC amount", choices=DEFAULT_SC_AMOUNTS, required=True
     )
-    price_of_codes = forms.DecimalField(
-        label="Price of codes (per one)",
-        required=False,
-        help_text="Set the buying cost for each imported code.",
-    )
-    codes = forms.CharField(
-        min_length=1,
-        max_length=100_000 * 20,
-        required=True,
-        widget=forms.Textarea,
-        help_text="Input codes separated by space or line break",
-    )
 
-    def clean_codes(self):
-        codes = self.cleaned_data["codes"].split()
-        for code in codes:
-            if len(code) < MIN_CODE_LENGTH:
-                raise ValidationError(f'Too short code: "{code}"')
-            characters = string.ascii_letters + string.digits
-            if any(char not in characters for char in code):
-                raise ValidationError(f'Code has not valid symbols: "{code}"')
-        return codes
+    field_order = ("amount",)
@@ -0,0 +1,152 @@
+import logging
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .ledger import LEDGER_FIELDS, adjust_stock
+from .models import ArchivedCode, ImportJob
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 5000
+# Порция обрабатывается за секунды; задача без прогресса дольше этого считается потерянной
+IMPORT_STALE_AFTER = timedelta(minutes=15)
+# Коды активации: только латиница и цифры, не короче 15 символов
+CODE_PATTERN = re.compile(r"[A-Za-z0-9]{15,50}")
+# Подарочные карты бывают с дефисами и прочими символами
+GIFTCARD_PATTERN = re.compile(r"\S{1,50}")
+
+
+@dataclass
+class ImportResult:
+    processed: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+
+    def __str__(self):
+        return (
+            f"Inserted: {self.inserted}, duplicates: {self.duplicates}, "
+            f"invalid: {self.invalid}"
+        )
+
+
+def iter_codes(lines: Iterable[bytes | str]) -> Iterator[str]:
+    """Построчно разбирает текст или загруженный файл на коды."""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        yield from line.split()
+
+
+def insert_codes(model: type[models.Model], codes: list[str], **fields) -> int:
+    """
+    Вставляет коды и возвращает, сколько строк действительно добавлено.
+    Если параллельный импорт успел вставить часть кодов, они отбрасываются
+    и порция вставляется повторно.
+    """
+    while codes:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(code=code, **fields) for code in codes], batch_size=1000
+                )
+            return len(codes)
+        except IntegrityError:
+            taken = set(
+                model.objects.filter(code__in=codes).values_list("code", flat=True)
+            )
+            if not taken:
+                raise
+            codes = [code for code in codes if code not in taken]
+    return 0
+
+
+def import_codes(
+    model: type[models.Model],
+    codes: Iterable[str],
+    pattern: re.Pattern = CODE_PATTERN,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_chunk: Callable[[ImportResult], None] | None = None,
+    **fields,
+) -> ImportResult:
+    """Импортирует коды порциями, пропуская невалидные и уже существующие."""
+    result = ImportResult()
+    seen = set()
+    codes = iter(codes)
+    while chunk := list(islice(codes, chunk_size)):
+        valid = []
+        for code in chunk:
+            if not pattern.fullmatch(code):
+                result.invalid += 1
+            elif code in seen:
+                result.duplicates += 1
+            else:
+                seen.add(code)
+                valid.append(code)
+        # Уникальность кода проверяется и по архиву израсходованных кодов
+        existing = set(
+            model.objects.filter(code__in=valid).values_list("code", flat=True)
+        ) | set(
+            ArchivedCode.objects.filter(kind=model.kind, code__in=valid).values_list(
+                "code", flat=True
+            )
+        )
+        new = [code for code in valid if code not in existing]
+        inserted = insert_codes(model, new, **fields)
+        adjust_stock(model.kind, {fields[LEDGER_FIELDS[model.kind]]: inserted})
+        result.inserted += inserted
+        result.duplicates += len(valid) - inserted
+        result.processed += len(chunk)
+        if on_chunk:
+            on_chunk(result)
+    logger.info(f"{model.__name__} import finished. {result}")
+    return result
+
+
+def delete_import_file(job: ImportJob):
+    if job.file:
+        job.file.delete(save=False)
+    ImportJob.objects.filter(id=job.id).update(file="")
+
+
+def recover_import_jobs() -> int:
+    """
+    Возвращает в очередь задачи, застрявшие после падения воркера: RUNNING без
+    прогресса и PENDING, чьё сообщение потерялось. Импорт идемпотентен, поэтому
+    повтор безопасен. После MAX_ATTEMPTS задача помечается FAILED.
+    """
+    from .tasks import import_codes_task
+
+    stale_at = timezone.now() - IMPORT_STALE_AFTER
+    stale = ImportJob.objects.filter(
+        status=ImportJob.Status.RUNNING, heartbeat_at__lt=stale_at
+    ) | ImportJob.objects.filter(status=ImportJob.Status.PENDING, created_at__lt=stale_at)
+    requeued = 0
+    for job in stale:
+        if job.attempts >= ImportJob.MAX_ATTEMPTS:
+            if ImportJob.objects.filter(id=job.id, status=job.status).update(
+                status=ImportJob.Status.FAILED,
+                error="Import worker was lost too many times",
+                finished_at=timezone.now(),
+            ):
+                delete_import_file(job)
+            continue
+        if ImportJob.objects.filter(id=job.id, status=job.status).update(
+            status=ImportJob.Status.PENDING
+        ):
+            logger.warning(f"Import job {job.id} was stuck in {job.status}, requeued")
+            import_codes_task.delay(job.id)
+            requeued += 1
+    return requeued
+
+
+async def schedule_import_jobs_recovery():
+    from .tasks import recover_import_jobs_task
+
+    recover_import_jobs_task.delay()
@@ -0,0 +1,162 @@
+import logging
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, QuerySet
+from redis import RedisError
+
+from backend.redis_client import redis_client
+
+from .models import CodeKind, Giftcard, StockbleCode, UcCode
+from .selection import unexpired
+
+logger = logging.getLogger(__name__)
+
+STOCK_KEY = "stock:{kind}:{key}"
+STOCK_TTL = 60 * 60 * 24
+# Поле, по которому ведётся остаток каждого вида кодов
+LEDGER_FIELDS = {
+    CodeKind.UC: "amount",
+    CodeKind.STOCKBLE: "amount",
+    CodeKind.GIFTCARD: "item_id",
+}
+
+# Меняет остаток, только если он уже засеян из БД, и не уводит его ниже нуля
+ADJUST_SCRIPT = redis_client.register_script(
+    """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return nil
+end
+local value = math.max(tonumber(current) + tonumber(ARGV[1]), 0)
+redis.call('SET', KEYS[1], value, 'KEEPTTL')
+return value
+"""
+)
+
+# Засевает остатки из БД, не перетирая уже засеянные, и возвращает актуальные
+SEED_SCRIPT = redis_client.register_script(
+    """
+local ttl = ARGV[#KEYS + 1]
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, ARGV[i], 'NX', 'EX', ttl)
+end
+return redis.call('MGET', unpack(KEYS))
+"""
+)
+
+
+def get_free_codes(kind: CodeKind):
+    """Коды, доступные для резервирования: свободные и не просроченные."""
+    if kind == CodeKind.UC:
+        return UcCode.objects.filter(
+            unexpired(), order__isnull=True, is_activated=False
+        )
+    if kind == CodeKind.STOCKBLE:
+        return StockbleCode.objects.filter(unexpired(), order__isnull=True)
+    return Giftcard.objects.filter(unexpired(), order__isnull=True)
+
+
+def count_free_codes(
+    kind: CodeKind, keys: list[int] | None = None, among: QuerySet | None = None
+) -> dict[int, int]:
+    field = LEDGER_FIELDS[kind]
+    codes = get_free_codes(kind)
+    if among is not None:
+        codes = codes.filter(id__in=among.values("id"))
+    if keys is not None:
+        codes = codes.filter(**{f"{field}__in": keys})
+    return dict(
+        codes.values(field)
+        .annotate(count=Count("id"))
+        .values_list(field, "count")
+        .order_by()
+    )
+
+
+def get_stock_key(kind: CodeKind, key: int) -> str:
+    return STOCK_KEY.format(kind=kind, key=key)
+
+
+def get_stock_counts(kind: CodeKind, keys: list[int]) -> dict[int, int]:
+    """
+    Остатки свободных кодов из Redis. Незасеянные ключи считаются в БД одним запросом.
+    Это подсказка для меню и предпроверок, резервирование всё равно идёт через БД.
+    """
+    try:
+        values = redis_client.mget([get_stock_key(kind, key) for key in keys])
+        missing = [key for key, value in zip(keys, values) if value is None]
+        counts = {key: int(value) for key, value in zip(keys, values) if value is not None}
+        if missing:
+            db_counts = count_free_codes(kind, missing)
+            seeded = SEED_SCRIPT(
+                keys=[get_stock_key(kind, key) for key in missing],
+                args=[db_counts.get(key, 0) for key in missing] + [STOCK_TTL],
+            )
+            counts |= {key: int(value) for key, value in zip(missing, seeded)}
+        return counts
+    except RedisError as e:
+        logger.warning(f"Stock ledger is unavailable, counting in DB: {e}")
+        db_counts = count_free_codes(kind, keys)
+        return {key: db_counts.get(key, 0) for key in keys}
+
+
+def get_stock(kind: CodeKind, key: int) -> int:
+    return get_stock_counts(kind, [key])[key]
+
+
+def adjust_stock(kind: CodeKind, deltas: dict[int, int]):
+    pipe = redis_client.pipeline()
+    for key, delta in deltas.items():
+        if delta:
+            ADJUST_SCRIPT(keys=[get_stock_key(kind, key)], args=[delta], client=pipe)
+    try:
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Stock ledger adjustment {kind} {deltas} is lost: {e}")
+
+
+def adjust_stock_on_commit(kind: CodeKind, deltas: dict[int, int]):
+    """Остаток в Redis меняется только после фиксации изменений в БД."""
+    transaction.on_commit(partial(adjust_stock, kind, deltas))
+
+
+def adjust_stock_for_deleted(codes: QuerySet):
+    """
+    Вычитает из остатков свободные коды, которые сейчас будут удалены.
+    Удаления не отслеживаются сигналами, чтобы массовое удаление (например,
+    при архивации) оставалось одним DELETE без обработки каждой строки.
+    """
+    kind = codes.model.kind
+    deleted = count_free_codes(kind, among=codes)
+    adjust_stock_on_commit(kind, {key: -count for key, count in deleted.items()})
+
+
+def reconcile_stock() -> int:
+    """Сверяет засеянные остатки с БД и исправляет расхождения. Возвращает их число."""
+    drifted = 0
+    for kind in CodeKind:
+        db_counts = count_free_codes(kind)
+        prefix = get_stock_key(kind, "")
+        keys = [
+            int(redis_key.removeprefix(prefix))
+            for redis_key in redis_client.scan_iter(f"{prefix}*")
+        ]
+        if not keys:
+            continue
+        values = redis_client.mget([get_stock_key(kind, key) for key in keys])
+        pipe = redis_client.pipeline()
+        for key, value in zip(keys, values):
+            actual = db_counts.get(key, 0)
+            if value is not None and int(value) != actual:
+                logger.warning(f"Stock ledger drift {kind}:{key}: {value} != {actual}")
+                pipe.set(get_stock_key(kind, key), actual, ex=STOCK_TTL)
+                drifted += 1
+        pipe.execute()
+    return drifted
+
+
+async def schedule_stock_reconcile():
+    from .tasks import reconcile_stock_task
+
+    reconcile_stock_task.delay()
@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-19 04:33
+
+import codes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('codes', '0008_giftcard_buying_cost_stockblecode_buying_cost_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('uc', 'UC codes'), ('stockble', 'Stockble codes'), ('giftcard', 'Giftcards')], max_length=20, verbose_name='Kind')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('file', models.FileField(blank=True, upload_to=codes.models.get_import_path, verbose_name='File')),
+                ('params', models.JSONField(default=dict, verbose_name='Parameters')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Processed')),
+                ('inserted', models.PositiveIntegerField(default=0, verbose_name='Inserted')),
+                ('duplicates', models.PositiveIntegerField(default=0, verbose_name='Duplicates')),
+                ('invalid', models.PositiveIntegerField(default=0, verbose_name='Invalid')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creation date')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finish date')),
+            ],
+            options={
+                'verbose_name': 'Import job',
+                'verbose_name_plural': 'Import jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-19 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('codes', '0009_importjob'),
+        ('items', '0019_freefireregion'),
+        ('orders', '0013_order_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('uc', 'UC codes'), ('stockble', 'Stockble codes'), ('giftcard', 'Giftcards')], max_length=20, verbose_name='Kind')),
+                ('code', models.CharField(max_length=50, verbose_name='Code')),
+                ('amount', models.PositiveIntegerField(blank=True, null=True, verbose_name='Nominal')),
+                ('buying_cost', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Buying Cost')),
+                ('status', models.CharField(blank=True, max_length=50, null=True, verbose_name='API status')),
+                ('activator', models.CharField(blank=True, choices=[('kokos', 'Kokos'), ('fars', 'FARS'), ('smileone', 'SmileOne'), ('ucodeium', 'UCodeium')], null=True, verbose_name='Successful Activator')),
+                ('is_success', models.BooleanField(blank=True, null=True, verbose_name='Is activated successfully')),
+                ('created_at', models.DateTimeField(verbose_name='Creation date')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archive date')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_codes', to='items.giftcarditem', verbose_name='Item in menu')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_codes', to='orders.order', verbose_name='Order')),
+            ],
+            options={
+                'verbose_name': 'Archived code',
+                'verbose_name_plural': 'Archived codes',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'code'), name='archived_code_unique')],
+            },
+        ),
+    ]
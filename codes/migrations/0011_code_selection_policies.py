@@ -0,0 +1,78 @@
+# Generated by Django 5.1 on 2026-10-19 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('codes', '0010_archivedcode'),
+        ('items', '0019_freefireregion'),
+        ('orders', '0013_order_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='giftcard',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Used by the expiring-first selection policy.', null=True, verbose_name='Expiration date'),
+        ),
+        migrations.AddField(
+            model_name='stockblecode',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Used by the expiring-first selection policy.', null=True, verbose_name='Expiration date'),
+        ),
+        migrations.AddField(
+            model_name='uccode',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Used by the expiring-first selection policy.', null=True, verbose_name='Expiration date'),
+        ),
+        migrations.AddIndex(
+            model_name='giftcard',
+            index=models.Index(models.F('item'), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='giftcard_fifo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='giftcard',
+            index=models.Index(models.F('item'), models.OrderBy(models.F('buying_cost'), nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='giftcard_cheapest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='giftcard',
+            index=models.Index(models.F('item'), models.OrderBy(models.F('buying_cost'), descending=True, nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='giftcard_most_expensive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='giftcard',
+            index=models.Index(models.F('item'), models.OrderBy(models.F('expires_at'), nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='giftcard_expiring_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockblecode',
+            index=models.Index(models.F('amount'), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='stockble_fifo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockblecode',
+            index=models.Index(models.F('amount'), models.OrderBy(models.F('buying_cost'), nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='stockble_cheapest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockblecode',
+            index=models.Index(models.F('amount'), models.OrderBy(models.F('buying_cost'), descending=True, nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='stockble_most_expensive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockblecode',
+            index=models.Index(models.F('amount'), models.OrderBy(models.F('expires_at'), nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='stockble_expiring_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uccode',
+            index=models.Index(models.F('amount'), models.OrderBy(models.F('is_priority_use'), descending=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='uccode_fifo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uccode',
+            index=models.Index(models.F('amount'), models.OrderBy(models.F('is_priority_use'), descending=True), models.OrderBy(models.F('buying_cost'), nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='uccode_cheapest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uccode',
+            index=models.Index(models.F('amount'), models.OrderBy(models.F('is_priority_use'), descending=True), models.OrderBy(models.F('buying_cost'), descending=True, nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='uccode_most_expensive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uccode',
+            index=models.Index(models.F('amount'), models.OrderBy(models.F('is_priority_use'), descending=True), models.OrderBy(models.F('expires_at'), nulls_last=True), models.F('created_at'), condition=models.Q(('order__isnull', True)), name='uccode_expiring_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-19 05:15
+
+import codes.models
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_import_files(apps, schema_editor):
+    """Переносит файлы импортов из публичного MEDIA_ROOT в приватное хранилище."""
+    ImportJob = apps.get_model('codes', 'ImportJob')
+    storage = codes.models.get_import_storage()
+    for name in ImportJob.objects.exclude(file='').values_list('file', flat=True):
+        if not default_storage.exists(name):
+            continue
+        with default_storage.open(name, 'rb') as file:
+            storage.save(name, file)
+        default_storage.delete(name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('codes', '0011_code_selection_policies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Last progress'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(blank=True, storage=codes.models.get_import_storage, upload_to=codes.models.get_import_path, verbose_name='File'),
+        ),
+        migrations.RunPython(move_import_files, migrations.RunPython.noop),
+    ]
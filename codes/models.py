@@ -1,4 +1,9 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.db.models import F, Q
 
 from backend.constants import DEFAULT_SC_AMOUNTS, DEFAULT_UC_AMOUNTS
 
@@ -34,6 +39,12 @@ class ActivatorPriority(models.Model):
         return f"{self.get_name_display()} - Priority {self.order} ({status})"
 
 
+class CodeKind(models.TextChoices):
+    UC = "uc", "UC codes"
+    STOCKBLE = "stockble", "Stockble codes"
+    GIFTCARD = "giftcard", "Giftcards"
+
+
 class AbstractCode(models.Model):
     code = models.CharField(max_length=50, unique=True, verbose_name="Code")
     buying_cost = models.DecimalField(
@@ -44,6 +55,12 @@ class AbstractCode(models.Model):
         blank=True,
         help_text="The cost price of this specific code.",
     )
+    expires_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Expiration date",
+        help_text="Used by the expiring-first selection policy.",
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updation date")
 
@@ -51,7 +68,31 @@ class AbstractCode(models.Model):
         abstract = True
 
 
+# Ключи сортировки политик выдачи кодов (см. codes.selection), перед created_at
+SELECTION_KEYS = {
+    "fifo": (),
+    "cheapest": (F("buying_cost").asc(nulls_last=True),),
+    "most_expensive": (F("buying_cost").desc(nulls_last=True),),
+    "expiring": (F("expires_at").asc(nulls_last=True),),
+}
+
+
+def get_selection_indexes(prefix: str, *fields) -> list[models.Index]:
+    """Частичные индексы свободных кодов под каждую политику выдачи."""
+    return [
+        models.Index(
+            *(F(field[1:]).desc() if field.startswith("-") else F(field) for field in fields),
+            *key,
+            F("created_at"),
+            name=f"{prefix}_{policy}_idx",
+            condition=Q(order__isnull=True),
+        )
+        for policy, key in SELECTION_KEYS.items()
+    ]
+
+
 class UcCode(AbstractCode):
+    kind = CodeKind.UC
     amount = models.PositiveIntegerField(
         choices=DEFAULT_UC_AMOUNTS, verbose_name="Nominal"
     )
@@ -87,9 +128,11 @@ class UcCode(AbstractCode):
     class Meta:
         verbose_name = "UC activating code"
         verbose_name_plural = "UC activating codes"
+        indexes = get_selection_indexes("uccode", "amount", "-is_priority_use")
 
 
 class StockbleCode(AbstractCode):
+    kind = CodeKind.STOCKBLE
     amount = models.IntegerField(choices=DEFAULT_SC_AMOUNTS, verbose_name="Nominal")
     order = models.ForeignKey(
         "orders.Order",
@@ -103,9 +146,11 @@ class StockbleCode(AbstractCode):
     class Meta:
         verbose_name = "PUBG STOCKBLE CODE"
         verbose_name_plural = "PUBG STOCKBLE CODES"
+        indexes = get_selection_indexes("stockble", "amount")
 
 
 class Giftcard(AbstractCode):
+    kind = CodeKind.GIFTCARD
     order = models.ForeignKey(
         "orders.Order",
         blank=True,
@@ -124,3 +169,107 @@ class Giftcard(AbstractCode):
     class Meta:
         verbose_name = "GIFTCARD"
         verbose_name_plural = "GIFTCARDS"
+        indexes = get_selection_indexes("giftcard", "item")
+
+
+def get_import_storage():
+    # Файлы с непогашенными кодами хранятся вне MEDIA_ROOT, который раздаёт nginx
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+
+def get_import_path(instance, filename):
+    return f"imports/{uuid4().hex}.txt"
+
+
+class ImportJob(models.Model):
+    Kind = CodeKind
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    MAX_ATTEMPTS = 3
+
+    kind = models.CharField(max_length=20, choices=Kind, verbose_name="Kind")
+    status = models.CharField(
+        max_length=20, choices=Status, default=Status.PENDING, verbose_name="Status"
+    )
+    file = models.FileField(
+        upload_to=get_import_path,
+        storage=get_import_storage,
+        blank=True,
+        verbose_name="File",
+    )
+    params = models.JSONField(default=dict, verbose_name="Parameters")
+    processed = models.PositiveIntegerField(default=0, verbose_name="Processed")
+    inserted = models.PositiveIntegerField(default=0, verbose_name="Inserted")
+    duplicates = models.PositiveIntegerField(default=0, verbose_name="Duplicates")
+    invalid = models.PositiveIntegerField(default=0, verbose_name="Invalid")
+    error = models.TextField(blank=True, verbose_name="Error")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Attempts")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
+    heartbeat_at = models.DateTimeField(
+        blank=True, null=True, verbose_name="Last progress"
+    )
+    finished_at = models.DateTimeField(
+        blank=True, null=True, verbose_name="Finish date"
+    )
+
+    class Meta:
+        verbose_name = "Import job"
+        verbose_name_plural = "Import jobs"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import #{self.id} ({self.status})"
+
+
+class ArchivedCode(models.Model):
+    """Израсходованный код старого завершённого заказа, вынесенный из рабочих таблиц."""
+
+    kind = models.CharField(max_length=20, choices=CodeKind, verbose_name="Kind")
+    code = models.CharField(max_length=50, verbose_name="Code")
+    amount = models.PositiveIntegerField(blank=True, null=True, verbose_name="Nominal")
+    buying_cost = models.DecimalField(
+        max_digits=10,
+        decimal_places=3,
+        verbose_name="Buying Cost",
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        max_length=50, blank=True, null=True, verbose_name="API status"
+    )
+    activator = models.CharField(
+        blank=True, null=True, choices=Activator, verbose_name="Successful Activator"
+    )
+    is_success = models.BooleanField(
+        blank=True, null=True, verbose_name="Is activated successfully"
+    )
+    order = models.ForeignKey(
+        "orders.Order",
+        on_delete=models.CASCADE,
+        related_name="archived_codes",
+        verbose_name="Order",
+    )
+    item = models.ForeignKey(
+        "items.GiftcardItem",
+        blank=True,
+        null=True,
+        on_delete=models.PROTECT,
+        related_name="archived_codes",
+        verbose_name="Item in menu",
+    )
+    created_at = models.DateTimeField(verbose_name="Creation date")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Archive date")
+
+    class Meta:
+        verbose_name = "Archived code"
+        verbose_name_plural = "Archived codes"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("kind", "code"), name="archived_code_unique"
+            ),
+        ]
@@ -0,0 +1,179 @@
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count
+
+from backend.constants import CODES_MAP, UC_RECIPES
+
+from .ledger import get_stock_counts
+from .models import CodeKind, UcCode
+from .selection import get_selection_policy, unexpired
+
+logger = logging.getLogger(__name__)
+
+UC_TARGETS = sorted(set(CODES_MAP) | set(UC_RECIPES))
+
+
+def get_recipes(amount: int) -> list[list[int]]:
+    """Все способы собрать номинал: ручные рецепты либо разбиение из CODES_MAP."""
+    if amount in UC_RECIPES:
+        return UC_RECIPES[amount]
+    if amount in CODES_MAP:
+        return [CODES_MAP[amount]]
+    return []
+
+
+UC_NOMINALS = sorted(
+    {
+        nominal
+        for amount in UC_TARGETS
+        for recipe in get_recipes(amount)
+        for nominal in recipe
+    }
+)
+
+
+def max_units(recipes: list[list[int]], counts: dict[int, int]) -> int:
+    """
+    Сколько единиц товара можно продать. Резервирование повторяет один рецепт
+    на все единицы заказа, поэтому считается лучший одиночный рецепт.
+    """
+    return max(
+        (
+            min(counts.get(nominal, 0) // count for nominal, count in need.items())
+            for need in map(Counter, recipes)
+        ),
+        default=0,
+    )
+
+
+@dataclass
+class StockGroup:
+    is_priority_use: bool
+    buying_cost: Decimal | None
+    count: int
+
+
+def get_tier_cost(groups: list[StockGroup], taken: int, policy: str) -> Decimal:
+    """Себестоимость taken кодов из групп в порядке политики выдачи."""
+    if not taken:
+        return Decimal(0)
+    if policy not in ("cheapest", "most_expensive"):
+        # Порядок выдачи не зависит от цены, считаем по средней себестоимости
+        total = sum(group.count for group in groups)
+        costs = sum(group.count * (group.buying_cost or Decimal(0)) for group in groups)
+        return taken * costs / total
+    known = sorted(
+        (group for group in groups if group.buying_cost is not None),
+        key=lambda group: group.buying_cost,
+        reverse=policy == "most_expensive",
+    )
+    cost = Decimal(0)
+    for group in known:
+        count = min(taken, group.count)
+        cost += count * group.buying_cost
+        taken -= count
+    return cost
+
+
+class StockSnapshot:
+    """
+    Свободные UC-коды по номиналам, загруженные одним запросом.
+    Результаты расчёта кэшируются и переиспользуются всеми товарами.
+    """
+
+    def __init__(self, groups: dict[int, list[StockGroup]]):
+        self.groups = groups
+        self.counts = {
+            amount: sum(group.count for group in nominal_groups)
+            for amount, nominal_groups in groups.items()
+        }
+        self._max_units = {}
+
+    @classmethod
+    def load(cls) -> "StockSnapshot":
+        rows = (
+            UcCode.objects.filter(unexpired(), order__isnull=True, is_activated=False)
+            .values("amount", "is_priority_use", "buying_cost")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        groups = defaultdict(list)
+        for row in rows:
+            groups[row.pop("amount")].append(StockGroup(**row))
+        return cls(groups)
+
+    @classmethod
+    async def aload(cls) -> "StockSnapshot":
+        return await sync_to_async(cls.load)()
+
+    @classmethod
+    def from_ledger(cls) -> "StockSnapshot":
+        """Снимок по остаткам из Redis: годится для подсчёта единиц, но не себестоимости."""
+        counts = get_stock_counts(CodeKind.UC, UC_NOMINALS)
+        return cls(
+            {
+                amount: [StockGroup(is_priority_use=False, buying_cost=None, count=count)]
+                for amount, count in counts.items()
+                if count
+            }
+        )
+
+    @classmethod
+    async def afrom_ledger(cls) -> "StockSnapshot":
+        return await sync_to_async(cls.from_ledger)()
+
+    def max_units(self, amount: int) -> int:
+        if amount not in self._max_units:
+            self._max_units[amount] = max_units(get_recipes(amount), self.counts)
+        return self._max_units[amount]
+
+    def estimate(self, need: Counter, quantity: int) -> tuple[int, Decimal]:
+        """Сколько приоритетных кодов заберёт рецепт и во что он обойдётся."""
+        priority, cost = 0, Decimal(0)
+        for nominal, count in need.items():
+            left = count * quantity
+            policy = get_selection_policy(UcCode.kind, nominal)
+            for is_priority_use in (True, False):
+                tier = [
+                    group
+                    for group in self.groups.get(nominal, [])
+                    if group.is_priority_use == is_priority_use
+                ]
+                taken = min(left, sum(group.count for group in tier))
+                if is_priority_use:
+                    priority += taken
+                cost += get_tier_cost(tier, taken, policy)
+                left -= taken
+        return priority, cost
+
+    def capacity_after(self, need: Counter, quantity: int) -> int:
+        """Сколько единиц всех товаров можно будет собрать после рецепта."""
+        rest = {
+            nominal: count - need.get(nominal, 0) * quantity
+            for nominal, count in self.counts.items()
+        }
+        return sum(max_units(get_recipes(amount), rest) for amount in UC_TARGETS)
+
+    def choose_recipe(self, amount: int, quantity: int = 1) -> list[int] | None:
+        """
+        Выполнимый рецепт для заказа: больше приоритетных кодов, ниже себестоимость,
+        при равенстве остаётся больше возможностей собрать другие товары.
+        """
+        candidates = []
+        for recipe in get_recipes(amount):
+            need = Counter(recipe)
+            if any(
+                self.counts.get(nominal, 0) < count * quantity
+                for nominal, count in need.items()
+            ):
+                continue
+            priority, cost = self.estimate(need, quantity)
+            capacity = self.capacity_after(need, quantity)
+            candidates.append(((-priority, cost, -capacity), recipe))
+        if not candidates:
+            return None
+        return min(candidates, key=lambda candidate: candidate[0])[1]
@@ -0,0 +1,30 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.config import CODES_CONFIG
+
+from .models import SELECTION_KEYS, AbstractCode, UcCode
+
+
+def get_selection_policy(kind: str, amount: int | None = None) -> str:
+    """Политика выдачи для номинала, затем для вида кодов, затем общая."""
+    policies = CODES_CONFIG.SELECTION_POLICIES
+    return (
+        policies.get(f"{kind}:{amount}")
+        or policies.get(kind)
+        or CODES_CONFIG.DEFAULT_SELECTION_POLICY
+    )
+
+
+def unexpired() -> Q:
+    """Коды без срока годности или с ещё не истёкшим сроком."""
+    return Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+
+
+def get_selection_ordering(model: type[AbstractCode], amount: int | None = None):
+    """Сортировка свободных кодов для резервирования, совпадает с индексами моделей."""
+    ordering = (*SELECTION_KEYS[get_selection_policy(model.kind, amount)], "created_at")
+    if model is UcCode:
+        # Приоритетные коды всегда выдаются раньше обычных
+        return ("-is_priority_use", *ordering)
+    return ordering
@@ -4,7 +4,8 @@ from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from .models import UcCode
+from .ledger import LEDGER_FIELDS, adjust_stock_on_commit
+from .models import Giftcard, StockbleCode, UcCode
 from .tasks import activate_code_task
 
 logger = logging.getLogger(__name__)
@@ -21,3 +22,17 @@ def uccode_post_save(sender, instance: UcCode, created, **kwargs):
             f'Code {instance.code} was attached to order #{instance.order.id}. '
             f'Activation task has been scheduled to run on transaction commit.'
         )
+
+
+def is_free(code) -> bool:
+    return code.order_id is None and not getattr(code, "is_activated", False)
+
+
+@receiver(post_save, sender=UcCode)
+@receiver(post_save, sender=StockbleCode)
+@receiver(post_save, sender=Giftcard)
+def code_created(sender, instance, created, **kwargs):
+    """Коды, добавленные поштучно (например, в админке), сразу учитываются в остатках."""
+    if created and is_free(instance):
+        key = getattr(instance, LEDGER_FIELDS[sender.kind])
+        adjust_stock_on_commit(sender.kind, {key: 1})
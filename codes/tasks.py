@@ -1,12 +1,18 @@
 import logging
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
 
 from asgiref.sync import async_to_sync, sync_to_async
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import F
+from django.utils import timezone
 
 from backend.celery import app
-from backend.config import URL_CONFIG
+from backend.config import CODES_CONFIG, URL_CONFIG
 from bot.tasks import send_notification_task
+from bot.utils import send_notification
 from orders.models import Order
 from payments.activators import (
     aactivate_code,
@@ -14,48 +20,55 @@ from payments.activators import (
     aactivate_code_kokos,
 )
 
-from .models import Activator, ActivatorPriority, UcCode
+from .digest import (
+    DIGEST_WINDOW,
+    build_digest_messages,
+    pop_activation_results,
+    push_activation_result,
+)
+from .importer import (
+    CODE_PATTERN,
+    GIFTCARD_PATTERN,
+    ImportResult,
+    delete_import_file,
+    import_codes,
+    iter_codes,
+)
+from .models import (
+    Activator,
+    ActivatorPriority,
+    Giftcard,
+    ImportJob,
+    StockbleCode,
+    UcCode,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def _check_and_complete_order_sync(order_id: int):
-    try:
-        with transaction.atomic():
-            order_locked = Order.objects.select_for_update().get(id=order_id)
-
-            if order_locked.is_completed is not None:
-                logger.info(
-                    f"Order {order_id} already has a final status. Skipping check."
-                )
-                return
-
-            codes = UcCode.objects.filter(
-                order=order_locked, is_success=True
-            ).aggregate(Sum("amount"))
-            order_amount = order_locked.data.get("amount")
-            ready_amount = codes.get("amount__sum", 0) or 0
-
-            logger.info(
-                f"order_id={order_locked.id} order_amount={order_amount} ready_amount={ready_amount}"
+def add_activated_amounts(amounts: dict[int, int]):
+    """Наращивает счётчики активированных UC и завершает набравшие сумму заказы."""
+    for order_id, amount in amounts.items():
+        Order.objects.filter(id=order_id).update(
+            activated_amount=F("activated_amount") + amount
+        )
+    orders = Order.objects.filter(
+        id__in=amounts, status__in=Order.TRANSITIONS[Order.Status.COMPLETED]
+    ).only("id", "status", "data", "activated_amount")
+    for order in orders:
+        order_amount = order.data.get("amount")
+        logger.info(
+            f"order_id={order.id} order_amount={order_amount} ready_amount={order.activated_amount}"
+        )
+        if order.activated_amount < order_amount:
+            logger.info(f"Order {order.id} is not yet complete.")
+            continue
+        logger.info(f"Completing order {order.id}.")
+        if order.transition(Order.Status.COMPLETED):
+            transaction.on_commit(
+                partial(flush_activation_digest_task.delay, order.id)
             )
 
-            if ready_amount >= order_amount:
-                logger.info(
-                    f"Completing order {order_locked.id}. Setting is_completed=True."
-                )
-                order_locked.is_completed = True
-                order_locked.save(update_fields=("is_completed",))
-            else:
-                logger.info(f"Order {order_locked.id} is not yet complete.")
-
-    except Order.DoesNotExist:
-        logger.error(f"Order with id={order_id} not found during sync check.")
-
-
-async def check_order(order: Order):
-    await sync_to_async(_check_and_complete_order_sync, thread_sensitive=True)(order.id)
-
 
 async def activate_code(code: UcCode, pubg_id: str):
     logger.info(f"Activating code {code.code} for user {pubg_id}")
@@ -127,24 +140,76 @@ async def activate_code(code: UcCode, pubg_id: str):
     await process_result(code, final_success, final_status)
 
 
-async def process_result(code: UcCode, succ: bool, status: str):
-    code.is_activated = True
-    code.status = status
-    code.is_success = succ
-    await code.asave(update_fields=("is_activated", "status", "is_success"))
-    text = (
-        f"{'✅' if succ else '❗️'} "
-        f"Activating code {code.code} {'' if succ else 'NOT'} "
-        f"activated with status {status}"
-    )
-    logger.info(text)
-    chat_id = await sync_to_async(lambda: URL_CONFIG.ADMIN_ID)()
-    send_notification_task.delay(chat_id, text)
+def push_activation_digest(results: list[tuple[int, str]]):
+    """Добавляет строки в сводки заказов и планирует отправку новых сводок."""
+    for order_id, text in results:
+        if push_activation_result(order_id, text):
+            flush_activation_digest_task.apply_async(
+                args=[order_id], countdown=DIGEST_WINDOW
+            )
+
+
+def process_results(codes: list[UcCode], succ: bool, status: str):
+    """Фиксирует результат активации пачки кодов и проверяет каждый заказ один раз."""
+    lines = []
+    for code in codes:
+        code.is_activated = True
+        code.status = status
+        code.is_success = succ
+        text = (
+            f"{'✅' if succ else '❗️'} "
+            f"Activating code {code.code} {'' if succ else 'NOT'} "
+            f"activated with status {status}"
+        )
+        logger.info(text)
+        lines.append(text)
+
+    with transaction.atomic():
+        # Считаем только коды, впервые ставшие успешными, чтобы повторный
+        # результат не увеличил счётчик заказа дважды
+        newly_succeeded = Counter()
+        if succ:
+            for order_id, amount in (
+                UcCode.objects.select_for_update()
+                .filter(id__in=[code.id for code in codes], order__isnull=False)
+                .exclude(is_success=True)
+                .values_list("order_id", "amount")
+            ):
+                newly_succeeded[order_id] += amount
+        UcCode.objects.filter(id__in=[code.id for code in codes]).update(
+            is_activated=True, status=status, is_success=succ
+        )
+        if newly_succeeded:
+            add_activated_amounts(newly_succeeded)
+        # Строки сводки попадают в Redis только после фиксации, чтобы повтор
+        # задачи после отката не задублировал их
+        transaction.on_commit(
+            partial(
+                push_activation_digest,
+                [(code.order_id, text) for code, text in zip(codes, lines)],
+            )
+        )
 
     if not succ:
-        code.order.is_completed = False
-        await code.order.asave(update_fields=("is_completed",))
-    await check_order(code.order)
+        send_notification_task.delay(URL_CONFIG.ADMIN_ID, "\n".join(lines))
+        for order in Order.objects.filter(
+            id__in={code.order_id for code in codes if code.order_id}
+        ).only("id", "status"):
+            order.transition(Order.Status.FAILED)
+
+
+async def process_result(code: UcCode, succ: bool, status: str):
+    await sync_to_async(process_results)([code], succ, status)
+
+
+@app.task()
+def flush_activation_digest_task(order_id: int):
+    """Отправляет админу одну сводку по активациям заказа."""
+    lines = pop_activation_results(order_id)
+    if not lines:
+        return
+    for text in build_digest_messages(order_id, lines):
+        send_notification(URL_CONFIG.ADMIN_ID, text)
 
 
 @app.task()
@@ -155,3 +220,95 @@ def activate_code_task(code: str):
     if not uccode.is_activated and uccode.order and uccode.order.pubg_id:
         logger.info(f"Got activation task! code: {code}")
         async_to_sync(activate_code)(uccode, uccode.order.pubg_id)
+
+
+def get_import_target(job: ImportJob):
+    """Модель, шаблон проверки и значения полей для кодов задачи импорта."""
+    params = job.params
+    buying_cost = params.get("buying_cost")
+    expires_at = params.get("expires_at")
+    fields = {
+        "buying_cost": Decimal(buying_cost) if buying_cost else None,
+        "expires_at": datetime.fromisoformat(expires_at) if expires_at else None,
+    }
+    if job.kind == ImportJob.Kind.UC:
+        fields |= {
+            "amount": params["amount"],
+            "is_priority_use": params.get("is_priority_use", False),
+        }
+        return UcCode, CODE_PATTERN, fields
+    if job.kind == ImportJob.Kind.STOCKBLE:
+        return StockbleCode, CODE_PATTERN, fields | {"amount": params["amount"]}
+    return Giftcard, GIFTCARD_PATTERN, fields | {"item_id": params["item_id"]}
+
+
+def save_import_progress(job_id: int, result: ImportResult, **kwargs):
+    ImportJob.objects.filter(id=job_id).update(
+        processed=result.processed,
+        inserted=result.inserted,
+        duplicates=result.duplicates,
+        invalid=result.invalid,
+        heartbeat_at=timezone.now(),
+        **kwargs,
+    )
+
+
+@app.task()
+def import_codes_task(job_id: int):
+    """Импортирует коды из загруженного файла, сохраняя прогресс после каждой порции."""
+    if not ImportJob.objects.filter(
+        id=job_id, status=ImportJob.Status.PENDING
+    ).update(
+        status=ImportJob.Status.RUNNING,
+        attempts=F("attempts") + 1,
+        heartbeat_at=timezone.now(),
+    ):
+        return
+    job = ImportJob.objects.get(id=job_id)
+    try:
+        model, pattern, fields = get_import_target(job)
+        with job.file.open("rb") as file:
+            result = import_codes(
+                model,
+                iter_codes(file),
+                pattern,
+                on_chunk=partial(save_import_progress, job_id),
+                **fields,
+            )
+    except Exception as e:
+        logger.exception(f"Import job {job_id} failed")
+        ImportJob.objects.filter(id=job_id).update(
+            status=ImportJob.Status.FAILED, error=str(e), finished_at=timezone.now()
+        )
+    else:
+        save_import_progress(
+            job_id, result, status=ImportJob.Status.DONE, finished_at=timezone.now()
+        )
+    finally:
+        # Файл с непогашенными кодами не переживает задачу, даже неудачную
+        delete_import_file(job)
+
+
+@app.task()
+def recover_import_jobs_task():
+    """Перезапускает импорты, потерянные после падения воркера."""
+    from .importer import recover_import_jobs
+
+    recover_import_jobs()
+
+
+@app.task()
+def archive_codes_task():
+    """Выносит израсходованные коды старых заказов из рабочих таблиц."""
+    from .archive import archive_codes
+
+    archive_codes(CODES_CONFIG.ARCHIVE_AFTER_DAYS)
+
+
+@app.task()
+def reconcile_stock_task():
+    """Исправляет расхождения остатков в Redis с БД."""
+    from .ledger import reconcile_stock
+
+    if drifted := reconcile_stock():
+        logger.warning(f"Stock ledger had {drifted} drifted counters")
@@ -0,0 +1,19 @@
+from django.db import IntegrityError
+from django.test import TestCase
+
+from .importer import insert_codes
+from .models import StockbleCode
+
+
+class InsertCodesTests(TestCase):
+    def test_codes_inserted_concurrently_are_not_counted(self):
+        # Код уже вставлен параллельным импортом после проверки на дубликаты
+        StockbleCode.objects.create(code="A" * 15, amount=60)
+        inserted = insert_codes(StockbleCode, ["A" * 15, "B" * 15, "C" * 15], amount=60)
+        self.assertEqual(inserted, 2)
+        self.assertEqual(StockbleCode.objects.count(), 3)
+
+    def test_unrelated_integrity_error_is_raised(self):
+        StockbleCode.objects.create(code="A" * 15, amount=60)
+        with self.assertRaises(IntegrityError):
+            insert_codes(StockbleCode, ["B" * 15, "B" * 15], amount=60)
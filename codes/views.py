@@ -1,42 +1,50 @@
 import logging
+from functools import partial
 
+from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
 from django.http import HttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 
-from codes.models import Giftcard, StockbleCode, UcCode
-
 from .forms import GiftCardImportForm, ImportForm, StockbleCodeImportForm
+from .models import ImportJob
+from .tasks import import_codes_task
 
 MIN_PERCENT = 80
 
 logger = logging.getLogger(name=__name__)
 
 
+def start_import_job(request, kind: ImportJob.Kind, form, params: dict):
+    """Сохраняет файл с кодами и ставит импорт в очередь Celery."""
+    buying_cost = form.cleaned_data.get("price_of_codes")
+    params["buying_cost"] = str(buying_cost) if buying_cost is not None else None
+    expires_at = form.cleaned_data.get("expires_at")
+    params["expires_at"] = expires_at.isoformat() if expires_at else None
+    with transaction.atomic():
+        job = ImportJob(kind=kind, params=params)
+        job.file.save("codes.txt", form.get_file())
+        transaction.on_commit(partial(import_codes_task.delay, job.id))
+    messages.info(request, f"Import job #{job.id} is queued")
+    return redirect(reverse("admin:codes_importjob_change", args=(job.id,)))
+
+
 @staff_member_required
 def import_codes_view(request):
     if request.method == "POST":
         form = ImportForm(request.POST, request.FILES)
         if form.is_valid():
-            codes = form.cleaned_data["codes"]
-            amount = form.cleaned_data["amount"]
-            is_priority_use = form.cleaned_data["is_priority_use"]
-            buying_cost = form.cleaned_data.get("price_of_codes")
-            db_codes = [
-                UcCode(
-                    amount=amount,
-                    code=code,
-                    is_priority_use=is_priority_use,
-                    buying_cost=buying_cost,
-                )
-                for code in codes
-            ]
-            UcCode.objects.bulk_create(
-                db_codes,
-                batch_size=1000,
+            return start_import_job(
+                request,
+                ImportJob.Kind.UC,
+                form,
+                {
+                    "amount": int(form.cleaned_data["amount"]),
+                    "is_priority_use": form.cleaned_data["is_priority_use"],
+                },
             )
-            return redirect(reverse("admin:codes_uccode_changelist"))
         else:
             return HttpResponse(f"There error in form:\n {form.errors}")
     else:
@@ -47,50 +55,32 @@ def import_codes_view(request):
 @staff_member_required
 def import_giftcards_view(request):
     if request.method == "POST":
-        form = GiftCardImportForm(request.POST)
+        form = GiftCardImportForm(request.POST, request.FILES)
         if form.is_valid():
-            buying_cost = form.cleaned_data.get("price_of_codes")
-            db_codes = [
-                Giftcard(
-                    item=form.cleaned_data["item"],
-                    code=code,
-                    buying_cost=buying_cost,
-                )
-                for code in form.cleaned_data["codes"]
-            ]
-            Giftcard.objects.bulk_create(
-                db_codes,
-                batch_size=1000,
+            return start_import_job(
+                request,
+                ImportJob.Kind.GIFTCARD,
+                form,
+                {"item_id": form.cleaned_data["item"].id},
             )
-            return redirect(reverse("admin:codes_giftcard_changelist"))
         else:
             return HttpResponse(f"There error in form:\n {form.errors}")
     else:
-        form = ImportForm()
+        form = GiftCardImportForm()
     return render(request, "admin/import_codes.html", {"form": form})
 
 
 @staff_member_required
 def import_stockblecode_view(request):
     if request.method == "POST":
-        form = StockbleCodeImportForm(request.POST)
+        form = StockbleCodeImportForm(request.POST, request.FILES)
         if form.is_valid():
-            codes = form.cleaned_data["codes"]
-            amount = form.cleaned_data["amount"]
-            buying_cost = form.cleaned_data.get("price_of_codes")
-            db_codes = [
-                StockbleCode(
-                    amount=amount,
-                    code=code,
-                    buying_cost=buying_cost,
-                )
-                for code in codes
-            ]
-            StockbleCode.objects.bulk_create(
-                db_codes,
-                batch_size=1000,
+            return start_import_job(
+                request,
+                ImportJob.Kind.STOCKBLE,
+                form,
+                {"amount": int(form.cleaned_data["amount"])},
             )
-            return redirect(reverse("admin:codes_stockblecode_changelist"))
         else:
             return HttpResponse(f"There error in form:\n {form.errors}")
     else:
@@ -1,12 +1,11 @@
-from collections import Counter
-
 from asgiref.sync import sync_to_async
 from django.db import models
-from django.db.models import Count
 
 from admin_panel.models import ManagerChat
-from backend.constants import CODES_MAP, DEFAULT_UC_AMOUNTS, UC_RECIPES
-from codes.models import Activator, StockbleCode, UcCode
+from backend.constants import DEFAULT_UC_AMOUNTS
+from codes.ledger import count_free_codes, get_stock
+from codes.models import Activator, CodeKind
+from codes.recipes import StockSnapshot
 
 
 class Region(models.Model):
@@ -197,75 +196,44 @@ class Item(models.Model):
     def get_total_price(self, quantity: int):
         return self.price * quantity
 
-    def get_stock_amount(self):
+    def get_stock_amount(self, snapshot: StockSnapshot | None = None):
+        """
+        Остаток товара по Redis-леджеру, для предпроверок и меню.
+        Для UC можно передать общий снимок склада на несколько товаров.
+        """
+        if self.category == Item.Category.CODES:
+            return get_stock(CodeKind.STOCKBLE, self.amount)
+        if self.category == Item.Category.GIFTCARD:
+            return get_stock(CodeKind.GIFTCARD, self.id)
+        if self.category == Item.Category.PUBG_UC:
+            return (snapshot or StockSnapshot.from_ledger()).max_units(self.amount)
+        return None
+
+    async def aget_stock_amount(self, snapshot: StockSnapshot | None = None):
+        return await sync_to_async(self.get_stock_amount)(snapshot)
+
+    def count_stock_amount(self):
+        """Остаток товара, посчитанный по свободным кодам в БД."""
         if self.category == Item.Category.CODES:
-            return StockbleCode.objects.filter(
-                amount=self.amount, order__isnull=True
-            ).count()
+            return count_free_codes(CodeKind.STOCKBLE, [self.amount]).get(self.amount, 0)
         if self.category == Item.Category.GIFTCARD:
-            return self.giftcard_codes.filter(order__isnull=True).count()
+            return count_free_codes(CodeKind.GIFTCARD, [self.id]).get(self.id, 0)
         if self.category == Item.Category.PUBG_UC:
-            if self.amount not in UC_RECIPES:
-                nominals = CODES_MAP.get(self.amount)
-                if not nominals:
-                    return 0
-
-                counter = []
-                for nom in set(nominals):
-                    available_codes = UcCode.objects.filter(
-                        order__isnull=True,
-                        amount=nom,
-                    ).count()
-
-                    possible_items = available_codes // nominals.count(nom)
-                    counter.append(possible_items)
-
-                return min(counter) if counter else 0
-
-            recipes = UC_RECIPES.get(self.amount, [])
-            if not recipes:
-                return 0
-
-            all_possible_components = {
-                component for recipe in recipes for component in recipe
-            }
-            available_codes_counts = {
-                item["amount"]: item["count"]
-                for item in UcCode.objects.filter(
-                    order__isnull=True, amount__in=all_possible_components
-                )
-                .values("amount")
-                .annotate(count=Count("id"))
-            }
-
-            direct_recipe = [self.amount]
-            if direct_recipe in recipes:
-                direct_codes_count = available_codes_counts.get(self.amount, 0)
-                if direct_codes_count > 0:
-                    return direct_codes_count
-
-            for recipe in recipes:
-                if recipe == [self.amount]:
-                    continue
-
-                recipe_requirements = Counter(recipe)
-                possible_builds = []
-                can_build = True
-                for component, required_count in recipe_requirements.items():
-                    available_count = available_codes_counts.get(component, 0)
-                    if available_count < required_count:
-                        can_build = False
-                        break
-                    possible_builds.append(available_count // required_count)
-
-                if can_build and possible_builds:
-                    return min(possible_builds)
-
-            return 0
+            return StockSnapshot.load().max_units(self.amount)
         return None
 
-    async def aget_stock_amount(self):
-        return await sync_to_async(self.get_stock_amount)()
+    def get_available_amount(self, quantity: int = 1):
+        """
+        Остаток для проверки перед покупкой. Redis-леджер может разойтись с БД,
+        поэтому нехватку по нему перепроверяем в БД, а не отказываем сразу.
+        """
+        stock = self.get_stock_amount()
+        if stock is None or stock >= quantity:
+            return stock
+        return self.count_stock_amount()
+
+    async def aget_available_amount(self, quantity: int = 1):
+        return await sync_to_async(self.get_available_amount)(quantity)
 
 
 class CategoryDescription(models.Model):
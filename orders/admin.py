@@ -1,6 +1,20 @@
 from django.contrib import admin
 
-from .models import Order, TopUp
+from .models import DailySalesRollup, Order, OrderEvent, TopUp
+
+
+class OrderEventInline(admin.TabularInline):
+    model = OrderEvent
+    extra = 0
+    can_delete = False
+    readonly_fields = (
+        'from_status',
+        'to_status',
+        'attempts',
+        'last_error',
+        'created_at',
+        'processed_at',
+    )
 
 
 @admin.register(Order)
@@ -8,7 +22,7 @@ class OrderAdmin(admin.ModelAdmin):
 
     list_display = (
         'tg_user',
-        'is_completed',
+        'status',
         'item',
         'quantity',
         'created_at',
@@ -19,11 +33,13 @@ class OrderAdmin(admin.ModelAdmin):
     )
 
     list_filter = (
-        'is_completed',
+        'status',
         'tg_user',
     )
 
     readonly_fields = (
+        'status',
+        'is_completed',
         'tg_user',
         'item',
         'quantity',
@@ -34,6 +50,24 @@ class OrderAdmin(admin.ModelAdmin):
         'category',
         'pubg_id',
     )
+    inlines = (OrderEventInline,)
+    actions = ('mark_completed', 'mark_failed', 'cancel')
+
+    def _transition(self, request, queryset, status, **kwargs):
+        moved = sum(order.transition(status, **kwargs) for order in queryset)
+        self.message_user(request, f'{moved} of {len(queryset)} orders moved to {status.label}')
+
+    @admin.action(description='Mark as completed')
+    def mark_completed(self, request, queryset):
+        self._transition(request, queryset, Order.Status.COMPLETED)
+
+    @admin.action(description='Mark as failed')
+    def mark_failed(self, request, queryset):
+        self._transition(request, queryset, Order.Status.FAILED)
+
+    @admin.action(description='Cancel with refund')
+    def cancel(self, request, queryset):
+        self._transition(request, queryset, Order.Status.CANCELLED, refund=True)
 
 
 @admin.register(TopUp)
@@ -65,3 +99,28 @@ class TopUpAdmin(admin.ModelAdmin):
         'updated_at',
         'paid_at',
     )
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'day',
+        'category',
+        'item',
+        'orders',
+        'quantity',
+        'turnover',
+        'cost',
+        'profit',
+    )
+    list_filter = (
+        'category',
+        'day',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from orders.models import Order
+from orders.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает дневные итоги продаж по завершённым заказам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument("--end", type=date.fromisoformat, help="YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        first_order = Order.objects.order_by("created_at").first()
+        if not first_order:
+            self.stdout.write("No orders yet.")
+            return
+        start = options["start"] or timezone.localdate(first_order.created_at)
+        end = options["end"] or timezone.localdate()
+        self.stdout.write(f"Rebuilding sales rollups from {start} to {end}...")
+        count = rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Done: {count} rollup rows."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-19 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0019_freefireregion'),
+        ('orders', '0006_order_player_name_order_provider_transaction_id_and_more'),
+        ('users', '0004_tguser_delivery_state'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['tg_user', 'created_at', 'id'], name='order_user_history_idx'),
+        ),
+    ]
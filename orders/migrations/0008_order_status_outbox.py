@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-19 04:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_status(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.filter(is_completed=True).update(status='completed')
+    Order.objects.filter(is_completed=False).update(status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_user_history_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('reserved', 'Reserved'), ('activating', 'Activating'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], db_index=True, default='pending', max_length=20, verbose_name='Status'),
+        ),
+        migrations.RunPython(fill_status, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('reserved', 'Reserved'), ('activating', 'Activating'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], max_length=20, verbose_name='From status')),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('reserved', 'Reserved'), ('activating', 'Activating'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], max_length=20, verbose_name='To status')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creation date')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Processed at')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='orders.order', verbose_name='Order')),
+            ],
+            options={
+                'verbose_name': 'Order event',
+                'verbose_name_plural': 'Order events',
+                'ordering': ('id',),
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='order_event_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-19 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_status_outbox'),
+        ('users', '0004_tguser_delivery_state'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='topup',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['to_pay'], name='topup_open_to_pay_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-19 04:17
+
+from django.db import migrations, models
+
+
+def clear_duplicate_tx_ids(apps, schema_editor):
+    TopUp = apps.get_model('orders', 'TopUp')
+    TopUp.objects.filter(tx_id='').update(tx_id=None)
+    duplicates = (
+        TopUp.objects.exclude(tx_id=None)
+        .values('tx_id')
+        .annotate(count=models.Count('id'), first_id=models.Min('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        for topup in TopUp.objects.filter(tx_id=duplicate['tx_id']).exclude(
+            id=duplicate['first_id']
+        ):
+            topup.tx_id = f"{topup.tx_id[:80]}:dup{topup.id}"
+            topup.save(update_fields=('tx_id',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_topup_open_to_pay_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_tx_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='topup',
+            name='tx_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='txId'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-19 04:24
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def fill_activated_amount(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    UcCode = apps.get_model('codes', 'UcCode')
+    activated = (
+        UcCode.objects.filter(order=OuterRef('pk'), is_success=True)
+        .values('order')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    Order.objects.filter(
+        id__in=UcCode.objects.filter(is_success=True).values('order_id')
+    ).update(activated_amount=Subquery(activated))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_topup_tx_id_unique'),
+        ('codes', '0008_giftcard_buying_cost_stockblecode_buying_cost_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='activated_amount',
+            field=models.PositiveIntegerField(default=0, verbose_name='Activated UC amount'),
+        ),
+        migrations.RunPython(fill_activated_amount, migrations.RunPython.noop),
+    ]
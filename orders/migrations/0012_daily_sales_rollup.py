@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-19 04:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0019_freefireregion'),
+        ('orders', '0011_order_activated_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('category', models.CharField(choices=[('pubg_uc', 'PUBG UC'), ('codes', 'GIFTCARDS & CODES'), ('popularity', 'Popularity'), ('home_vote', 'HOME VOTE'), ('offers', 'Offers'), ('giftcard', 'Giftcard'), ('stars', 'Telegram Stars'), ('diamond', 'Mobilelegends diamond'), ('more_pubg', 'More PUBG Services'), ('free_fire', 'Free Fire')], max_length=20, verbose_name='Category')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Orders')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Quantity')),
+                ('turnover', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Turnover')),
+                ('cost', models.DecimalField(decimal_places=3, default=0, help_text='Only orders with a known buying cost', max_digits=14, verbose_name='Buying cost')),
+                ('profit', models.DecimalField(decimal_places=3, default=0, help_text='Only orders with a known buying cost', max_digits=14, verbose_name='Profit')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sales_rollups', to='items.item', verbose_name='Item')),
+            ],
+            options={
+                'verbose_name': 'Daily sales rollup',
+                'verbose_name_plural': 'Daily sales rollups',
+                'ordering': ('-day', 'category'),
+                'constraints': [models.UniqueConstraint(fields=('day', 'category', 'item'), name='daily_sales_rollup_unique')],
+            },
+        ),
+    ]
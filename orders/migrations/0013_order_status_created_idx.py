@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-19 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0019_freefireregion'),
+        ('orders', '0012_daily_sales_rollup'),
+        ('users', '0004_tguser_delivery_state'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+        ),
+    ]
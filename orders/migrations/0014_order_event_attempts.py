@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-19 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_order_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderevent',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='orderevent',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='Last error'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-19 06:10
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Дневные итоги за прошлые дни: без них отчёты показывают нули.
+    Себестоимость считается так же, как в orders.rollups, поэтому используется
+    сам rebuild_rollups, а не исторические модели.
+    """
+    from orders.rollups import rebuild_rollups
+
+    Order = apps.get_model('orders', 'Order')
+    first = Order.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    if first is None:
+        return
+    rebuild_rollups(timezone.localdate(first), timezone.localdate())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('codes', '0012_import_job_private_storage'),
+        ('items', '0019_freefireregion'),
+        ('orders', '0014_order_event_attempts'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
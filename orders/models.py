@@ -1,29 +1,65 @@
 import logging
 from collections import Counter
 from decimal import Decimal
-from enum import StrEnum
 
 from asgiref.sync import sync_to_async
 from django.db import models, transaction
-from django.db.models import Count
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils import timezone
 
 from backend.config import PAYMENT_CONFIG
-from backend.constants import CODES_MAP, UC_RECIPES
+from backend.tracking import TrackedFieldsMixin
 from bot.tasks import send_notification_task
-from codes.models import StockbleCode, UcCode
+from codes.ledger import adjust_stock_on_commit
+from codes.models import CodeKind, Giftcard, StockbleCode, UcCode
+from codes.recipes import StockSnapshot
+from codes.selection import get_selection_ordering, unexpired
 from items.models import Item
-from users.models import TgUser
+from users.models import BalanceEntry, TgUser
+
+from .slots import TOPUP_MAX_SLOTS, TOPUP_SLOT_STEP, reserve_slot
 
 logger = logging.getLogger(__name__)
 
+PLAYER_ID_LABELS = {
+    Item.Category.STARS: "USERNAME",
+    Item.Category.DIAMOND: "USERID",
+    Item.Category.FREE_FIRE: "Player ID",
+}
+
+
+RENDERING_RELATED = ("item__chat", "tg_user")
+
+
+def get_codes_prefetch():
+    return Prefetch("uc_codes", queryset=UcCode.objects.only("id", "code", "order_id"))
+
+
+class OrderQuerySet(models.QuerySet):
+    def for_rendering(self):
+        """Заказы со всем, что нужно для user_str/admin_str, без дозапросов."""
+        return self.select_related(*RENDERING_RELATED).prefetch_related(
+            get_codes_prefetch()
+        )
+
 
 class Order(models.Model):
-    class Status(StrEnum):
-        PENDING = "Pending"
-        COMPLETED = "Completed"
-        CANCELLED = "Cancelled"
-        FAILED = "Failed"
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RESERVED = "reserved", "Reserved"
+        ACTIVATING = "activating", "Activating"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+        CANCELLED = "cancelled", "Cancelled"
+
+    # Допустимые исходные статусы для каждого перехода
+    TRANSITIONS = {
+        Status.RESERVED: (Status.PENDING,),
+        Status.ACTIVATING: (Status.PENDING, Status.RESERVED),
+        Status.COMPLETED: (Status.PENDING, Status.RESERVED, Status.ACTIVATING),
+        Status.FAILED: (Status.PENDING, Status.RESERVED, Status.ACTIVATING),
+        Status.CANCELLED: (Status.PENDING, Status.RESERVED),
+    }
 
     tg_user = models.ForeignKey(
         TgUser, on_delete=models.CASCADE, verbose_name="TG USER"
@@ -48,21 +84,40 @@ class Order(models.Model):
         unique=True,
         verbose_name="Provider Transaction ID",
     )
+    status = models.CharField(
+        max_length=20,
+        choices=Status,
+        default=Status.PENDING,
+        db_index=True,
+        verbose_name="Status",
+    )
     is_completed = models.BooleanField(
         blank=True, null=True, verbose_name="Completed/Failed"
     )
     message_id = models.PositiveIntegerField(
         blank=True, null=True, verbose_name="Message id"
     )
+    activated_amount = models.PositiveIntegerField(
+        default=0, verbose_name="Activated UC amount"
+    )
     balance_before = models.DecimalField(
         max_digits=10, decimal_places=2, verbose_name="Balance before order"
     )
-    _status = None
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Order"
         verbose_name_plural = "Orders"
         ordering = ("created_at",)
+        indexes = [
+            models.Index(
+                fields=("tg_user", "created_at", "id"), name="order_user_history_idx"
+            ),
+            models.Index(
+                fields=("status", "created_at", "id"), name="order_status_created_idx"
+            ),
+        ]
 
     @property
     def title(self):
@@ -96,69 +151,57 @@ class Order(models.Model):
     async def ato_str(self):
         return await sync_to_async(self.to_str)()
 
+    def load_for_rendering(self):
+        """Догружает только то, чего ещё нет в кэше экземпляра."""
+        prefetch_related_objects([self], *RENDERING_RELATED, get_codes_prefetch())
+
+    def _player_id_str(self):
+        if not self.pubg_id:
+            return ""
+        return f"{PLAYER_ID_LABELS.get(self.category, 'PUBG ID')}: {self.pubg_id}\n"
+
+    def _codes_str(self):
+        codes = [code.code for code in self.uc_codes.all()]
+        return f"Code USED: {' '.join(codes)}\n" if codes else ""
+
+    def _balance_str(self):
+        return (
+            f"Balance before order: {self.balance_before}$\n"
+            f"Order Cost: {self.price}$\n"
+            f"Balance after Order: {self.balance_before - self.price.quantize(Decimal('0.01'))}$\n"
+        )
+
     def user_str(self):
+        self.load_for_rendering()
         status = {
             self.__class__.Status.PENDING: "",
+            self.__class__.Status.RESERVED: "",
+            self.__class__.Status.ACTIVATING: "",
             self.__class__.Status.COMPLETED: "completed ✅",
             self.__class__.Status.CANCELLED: "cancelled ❌",
             self.__class__.Status.FAILED: "failed ❌",
         }.get(self.status, "unknown")
         completed = f"Order {status}\n"
 
-        player_id_label = "PUBG ID"
-        if self.item.category == Item.Category.STARS:
-            player_id_label = "USERNAME"
-        elif self.item.category == Item.Category.DIAMOND:
-            player_id_label = "USERID"
-        elif self.item.category == Item.Category.FREE_FIRE:
-            player_id_label = "Player ID"
-
-        player_id_str = f"{player_id_label}: {self.pubg_id}\n" if self.pubg_id else ""
-
-        codes = (
-            f"Code USED: {' '.join([code.code for code in self.uc_codes.all()])}\n"
-            if self.uc_codes.all()
-            else ""
-        )
-
         return (
             f"{completed}"
             f"{self.title}\n"
-            f"{player_id_str}"
-            f"Balance before order: {self.balance_before}$\n"
-            f"Order Cost: {self.price}$\n"
-            f"Balance after Order: {self.balance_before - self.price.quantize(Decimal('0.01'))}$\n"
-            f"{codes}"
+            f"{self._player_id_str()}"
+            f"{self._balance_str()}"
+            f"{self._codes_str()}"
         )
 
     async def auser_str(self):
         return await sync_to_async(self.user_str)()
 
     def admin_str(self):
-        codes = (
-            f"Code USED: {' '.join([code.code for code in self.uc_codes.all()])}\n"
-            if self.uc_codes.all()
-            else ""
-        )
-
-        player_id_label = "PUBG ID"
-        if self.item.category == Item.Category.STARS:
-            player_id_label = "USERNAME"
-        elif self.item.category == Item.Category.DIAMOND:
-            player_id_label = "USERID"
-        elif self.item.category == Item.Category.FREE_FIRE:
-            player_id_label = "Player ID"
-
-        player_id_str = f"{player_id_label}: {self.pubg_id}\n" if self.pubg_id else ""
-
+        self.load_for_rendering()
         return (
             f"userid: {self.tg_user.tg_id}\n"
             f"Order: {self.title}\n"
-            f"{player_id_str}"
-            f"Balance before order: {self.balance_before}$\n"
-            f"Order Cost: {self.price}$\n"
-            f"Balance after Order: {self.balance_before - self.price.quantize(Decimal('0.01'))}$\n"
-            f"{codes}"
+            f"{self._player_id_str()}"
+            f"{self._balance_str()}"
+            f"{self._codes_str()}"
         )
 
     async def aadmin_str(self):
@@ -168,114 +211,155 @@ class Order(models.Model):
         self, force_insert=False, force_update=False, using=None, update_fields=None
     ):
         if not self.id:
-            self.tg_user.process_payment(amount=(-self.price))
-        return super().save(force_insert, force_update, using, update_fields)
+            with transaction.atomic():
+                points = TgUser.get_earned_points(-self.price)
+                balance, _ = TgUser.change_balance(self.tg_user_id, -self.price, points)
+                # Баланс до заказа берётся из того же UPDATE, что и списание
+                self.balance_before = balance + self.price
+                super().save(
+                    force_insert=force_insert,
+                    force_update=force_update,
+                    using=using,
+                    update_fields=update_fields,
+                )
+                # Запись журнала ссылается на заказ, поэтому пишется после него
+                BalanceEntry.objects.create(
+                    tg_user_id=self.tg_user_id,
+                    reason=BalanceEntry.Reason.ORDER,
+                    amount=-self.price,
+                    points=points,
+                    balance_after=balance,
+                    order=self,
+                )
+                self._record_event("", self.status)
+            return
+        return super().save(
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields,
+        )
+
+    def claim_codes(self, codes: models.QuerySet, limit: int) -> int:
+        """
+        Закрепляет за заказом до limit свободных кодов из codes.
+        Строки, заблокированные параллельной покупкой, пропускаются, а UPDATE
+        дополнительно проверяет, что код всё ещё свободен. Возвращает число кодов.
+        """
+        ids = list(
+            codes.select_for_update(skip_locked=True).values_list("id", flat=True)[
+                :limit
+            ]
+        )
+        return codes.model.objects.filter(id__in=ids, order__isnull=True).update(
+            order=self
+        )
 
     def grab_code(self):
         codes_count = self.stockble_codes.count()
-        if self.stockble_codes and codes_count == self.quantity:
-            return list(self.stockble_codes.all())
-        codes = StockbleCode.objects.filter(amount=self.item.amount)[
-            : (self.quantity - codes_count)
-        ]
-        for code in codes:
-            code.order = self
-            code.save(update_fields=("order",))
-        return list(self.stockble_codes.all())
+        if codes_count < self.quantity:
+            claimed = self.claim_codes(
+                StockbleCode.objects.filter(
+                    unexpired(), amount=self.item.amount, order__isnull=True
+                ).order_by(*get_selection_ordering(StockbleCode, self.item.amount)),
+                self.quantity - codes_count,
+            )
+            adjust_stock_on_commit(CodeKind.STOCKBLE, {self.item.amount: -claimed})
+        codes = list(self.stockble_codes.all())
+        if len(codes) == self.quantity:
+            self.transition(self.Status.RESERVED)
+        return codes
 
     def get_code_nominals(self):
         if self.category != Item.Category.PUBG_UC:
             raise ValueError("Order category must be PUBG_UC")
 
-        target_amount = self.item.amount
-
-        if target_amount not in UC_RECIPES:
-            return CODES_MAP.get(target_amount)
-
-        recipes = UC_RECIPES.get(target_amount, [])
-        if not recipes:
-            return None
-
-        all_possible_components = {comp for recipe in recipes for comp in recipe}
-        available_codes_counts = {
-            item["amount"]: item["count"]
-            for item in UcCode.objects.filter(
-                order__isnull=True, amount__in=all_possible_components
+        recipe = StockSnapshot.load().choose_recipe(self.item.amount, self.quantity)
+        if recipe:
+            logger.info(f"Для заказа #{self.id} выбран рецепт: {recipe}")
+        else:
+            logger.warning(
+                f"Для заказа #{self.id} не найдено ни одного выполнимого рецепта."
             )
-            .values("amount")
-            .annotate(count=Count("id"))
-        }
-
-        for recipe in recipes:
-            recipe_requirements = Counter(recipe)
-            is_viable = True
-            for component, required_count in recipe_requirements.items():
-                if (
-                    available_codes_counts.get(component, 0)
-                    < required_count * self.quantity
-                ):
-                    is_viable = False
-                    break
-
-            if is_viable:
-                logger.info(f"Для заказа #{self.id} выбран рецепт: {recipe}")
-                return recipe
-
-        logger.warning(
-            f"Для заказа #{self.id} не найдено ни одного выполнимого рецепта."
-        )
-        return None
+        return recipe
 
-    def grab_uc(self):
-        codes_sum = self.uc_codes.aggregate(models.Sum("amount"))["amount__sum"] or 0
-        if codes_sum >= self.item.amount * self.quantity:
-            return
+    def grab_uc(self) -> list[UcCode]:
+        """Резервирует UC-коды по одному рецепту. При нехватке возвращает пустой список."""
+        codes = list(self.uc_codes.all())
+        if sum(code.amount for code in codes) >= self.item.amount * self.quantity:
+            return codes
         nominals = self.get_code_nominals()
 
         if not nominals:
-            text = f"Not enough codes for item {self.item.amount} to fulfill order #{self.id}"
+            text = (
+                f"Not enough codes for item {self.item.amount} x {self.quantity}, "
+                f"purchase by user {self.tg_user_id} was rolled back"
+            )
             logger.error(text)
             self.send_manager_notification(text)
-            self.is_completed = False
-            self.save(update_fields=["is_completed"])
-            return
+            return []
 
         logger.info(f"Резервируем коды для заказа #{self.id} по рецепту {nominals}")
 
+        codes = []
         try:
             with transaction.atomic():
                 for _ in range(self.quantity):
                     for nom in nominals:
                         code = (
-                            UcCode.objects.select_for_update()
-                            .filter(amount=nom, is_activated=False, order__isnull=True)
-                            .order_by("-is_priority_use", "created_at")
+                            UcCode.objects.select_for_update(skip_locked=True)
+                            .filter(
+                                unexpired(),
+                                amount=nom,
+                                is_activated=False,
+                                order__isnull=True,
+                            )
+                            .order_by(*get_selection_ordering(UcCode, nom))
                             .first()
                         )
 
                         if code:
                             code.order = self
                             code.save(update_fields=("order",))
+                            codes.append(code)
                         else:
                             raise Exception(
                                 f"Race condition: Not enough codes of amount {nom} for order #{self.id}"
                             )
+                self.transition(self.Status.ACTIVATING)
+                adjust_stock_on_commit(
+                    CodeKind.UC,
+                    {
+                        nom: -count * self.quantity
+                        for nom, count in Counter(nominals).items()
+                    },
+                )
         except Exception as e:
             logger.error(f"Ошибка при резервировании кодов для заказа #{self.id}: {e}")
             self.send_manager_notification(
-                f"Critical error grabbing codes for order #{self.id}. Please check stock. Error: {e}"
+                f"Critical error grabbing codes for item {self.item.amount} "
+                f"x {self.quantity}, purchase was rolled back. Please check stock. "
+                f"Error: {e}"
             )
-            self.is_completed = False
-            self.save(update_fields=["is_completed"])
+            return []
+        return codes
 
     def grab_giftcard(self):
-        codes = self.item.giftcard_codes.filter(order__isnull=True)[: self.quantity]
-        for code in codes:
-            code.order = self
-            code.save()
+        claimed = self.claim_codes(
+            self.item.giftcard_codes.filter(unexpired(), order__isnull=True).order_by(
+                *get_selection_ordering(Giftcard)
+            ),
+            self.quantity,
+        )
+        adjust_stock_on_commit(CodeKind.GIFTCARD, {self.item_id: -claimed})
+        codes = list(self.giftcard_codes.all())
+        if len(codes) == self.quantity:
+            self.transition(self.Status.RESERVED)
         return codes
 
     def grab_codes(self):
+        # Коды меняются, отрендеренный ранее снимок заказа больше не актуален
+        self._prefetched_objects_cache = {}
         if self.item.category == Item.Category.CODES:
             return self.grab_code()
         if self.item.category == Item.Category.PUBG_UC:
@@ -296,36 +380,150 @@ class Order(models.Model):
         else:
             logger.warning(f"There no chat for Item {self.item.value}")
 
+    def _record_event(self, from_status: str, to_status: str):
+        from .tasks import relay_order_events_task
+
+        OrderEvent.objects.create(
+            order=self, from_status=from_status, to_status=to_status
+        )
+        transaction.on_commit(relay_order_events_task.delay)
+
+    def transition(self, status: Status, refund: bool = False) -> bool:
+        """
+        Переводит заказ в status, если это допустимо из текущего статуса.
+        Статус читается под блокировкой строки, поэтому переход выполняется
+        ровно один раз, а событие для рассылки побочных эффектов пишется
+        в той же транзакции с настоящим прежним статусом, даже если
+        экземпляр устарел.
+        """
+        is_completed = {
+            self.Status.COMPLETED: True,
+            self.Status.FAILED: False,
+            self.Status.CANCELLED: False,
+        }.get(status)
+        with transaction.atomic():
+            from_status = (
+                self.__class__.objects.select_for_update()
+                .values_list("status", flat=True)
+                .get(id=self.id)
+            )
+            if from_status not in self.TRANSITIONS[status]:
+                logger.info(
+                    f"Order {self.id} can`t move from `{from_status}` to `{status}`"
+                )
+                self.status = from_status
+                return False
+            self.__class__.objects.filter(id=self.id).update(
+                status=status, is_completed=is_completed, updated_at=timezone.now()
+            )
+            if refund:
+                self.tg_user.process_payment(
+                    self.price, BalanceEntry.Reason.REFUND, order=self
+                )
+            if status == self.Status.COMPLETED:
+                from .rollups import record_completed_order
+
+                record_completed_order(self.id)
+            self._record_event(from_status, status)
+        self.status = status
+        self.is_completed = is_completed
+        return True
+
+    async def atransition(self, status: Status, refund: bool = False) -> bool:
+        return await sync_to_async(self.transition)(status, refund)
+
     def cancel(self):
-        if self.is_completed is not None:
+        if not self.transition(self.Status.CANCELLED, refund=True):
             logger.error(
                 f"Order {self.id} can`t be cancelled! Because has alreary have status `{self.status}`"
             )
-            return
-        self._status = self.Status.CANCELLED
-        with transaction.atomic():
-            self.tg_user.process_payment(amount=self.price)
-            self.__class__.objects.filter(id=self.id).update(is_completed=False)
-        self.refresh_from_db()
-        send_notification_task(self.tg_user.tg_id, text=self.user_str())
 
     async def acancel(self):
         return await sync_to_async(self.cancel)()
 
-    @property
-    def status(self):
-        if self._status:
-            return self._status
-        if self.is_completed is None:
-            return self.__class__.Status.PENDING
-        return (
-            self.__class__.Status.COMPLETED
-            if self.is_completed
-            else self.__class__.Status.FAILED
-        )
 
+class OrderEvent(models.Model):
+    """Outbox переходов заказа, разбирается relay_order_events_task."""
 
-class TopUp(models.Model):
+    MAX_ATTEMPTS = 5
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="events", verbose_name="Order"
+    )
+    from_status = models.CharField(
+        max_length=20, choices=Order.Status, blank=True, verbose_name="From status"
+    )
+    to_status = models.CharField(
+        max_length=20, choices=Order.Status, verbose_name="To status"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Attempts")
+    last_error = models.TextField(blank=True, verbose_name="Last error")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
+    processed_at = models.DateTimeField(
+        blank=True, null=True, verbose_name="Processed at"
+    )
+
+    class Meta:
+        verbose_name = "Order event"
+        verbose_name_plural = "Order events"
+        ordering = ("id",)
+        indexes = [
+            models.Index(
+                fields=("id",),
+                condition=models.Q(processed_at__isnull=True),
+                name="order_event_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.order_id}: {self.from_status or '-'} → {self.to_status}"
+
+
+class DailySalesRollup(models.Model):
+    """Итоги продаж за день по товару, пополняются при завершении заказа."""
+
+    day = models.DateField(verbose_name="Day")
+    category = models.CharField(
+        max_length=20, choices=Item.Category, verbose_name="Category"
+    )
+    item = models.ForeignKey(
+        Item, on_delete=models.PROTECT, related_name="sales_rollups", verbose_name="Item"
+    )
+    orders = models.PositiveIntegerField(default=0, verbose_name="Orders")
+    quantity = models.PositiveIntegerField(default=0, verbose_name="Quantity")
+    turnover = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Turnover"
+    )
+    cost = models.DecimalField(
+        max_digits=14,
+        decimal_places=3,
+        default=0,
+        verbose_name="Buying cost",
+        help_text="Only orders with a known buying cost",
+    )
+    profit = models.DecimalField(
+        max_digits=14,
+        decimal_places=3,
+        default=0,
+        verbose_name="Profit",
+        help_text="Only orders with a known buying cost",
+    )
+
+    class Meta:
+        verbose_name = "Daily sales rollup"
+        verbose_name_plural = "Daily sales rollups"
+        ordering = ("-day", "category")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("day", "category", "item"), name="daily_sales_rollup_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category} {self.item_id}"
+
+
+class TopUp(TrackedFieldsMixin, models.Model):
     class Currency(models.TextChoices):
         USDT = "USDT", "USDT"
         RUB = "RUB", "RUB"
@@ -342,7 +540,9 @@ class TopUp(models.Model):
     to_pay = models.DecimalField(
         blank=True, max_digits=10, decimal_places=3, verbose_name="Total to pay"
     )
-    tx_id = models.CharField(max_length=100, blank=True, null=True, verbose_name="txId")
+    tx_id = models.CharField(
+        max_length=100, blank=True, null=True, unique=True, verbose_name="txId"
+    )
     is_paid = models.BooleanField(default=False, verbose_name="Paid")
     is_topped = models.BooleanField(default=False, verbose_name="Topped")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
@@ -352,11 +552,19 @@ class TopUp(models.Model):
     currency = models.CharField(
         max_length=10, choices=Currency, default=Currency.USDT, verbose_name="Currency"
     )
+    tracked_fields = ("is_paid", "is_topped")
 
     class Meta:
         verbose_name = "TopUp"
         verbose_name_plural = "TopUps"
         ordering = ("-id",)
+        indexes = [
+            models.Index(
+                fields=("to_pay",),
+                condition=models.Q(is_paid=False),
+                name="topup_open_to_pay_idx",
+            ),
+        ]
 
     def save(
         self, force_insert=False, force_update=False, using=None, update_fields=None
@@ -365,16 +573,32 @@ class TopUp(models.Model):
             self.generate_comission()
         if self.is_paid and not self.paid_at:
             self.paid_at = timezone.now()
-        return super().save(force_insert, force_update, using, update_fields)
+        return super().save(
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields,
+        )
 
-    def generate_comission(self, start: float = 0.001):
-        comission = start + PAYMENT_CONFIG.TOPUP_COMISSION
-        to_pay = Decimal(str(comission)) + self.amount
-        if TopUp.objects.filter(to_pay=to_pay, is_paid=False).exists():
-            start = start + 0.001
-            return self.generate_comission(start)
-        self.comission = comission
-        self.to_pay = to_pay
+    def generate_comission(self):
+        """
+        Подбирает наименьшую свободную уникальную сумму к оплате через слоты в Redis,
+        чтобы без других открытых пополнений надбавка оставалась минимальной.
+        """
+        base_comission = Decimal(str(PAYMENT_CONFIG.TOPUP_COMISSION))
+        ttl = PAYMENT_CONFIG.TOPUP_LIFETIME * 60
+        for slot in range(1, TOPUP_MAX_SLOTS + 1):
+            comission = base_comission + slot * TOPUP_SLOT_STEP
+            to_pay = (self.amount + comission).quantize(TOPUP_SLOT_STEP)
+            if not reserve_slot(to_pay, ttl):
+                continue
+            # Слот свободен в Redis, но в БД может остаться старое пополнение
+            if TopUp.objects.filter(to_pay=to_pay, is_paid=False).exists():
+                continue
+            self.comission = comission
+            self.to_pay = to_pay
+            return
+        raise ValueError(f"No free payment slot for amount {self.amount}")
 
     def convert_to_ustd(self) -> Decimal | None:
         if self.currency == self.Currency.RUB:
@@ -393,7 +617,7 @@ class TopUp(models.Model):
             amount = self.convert_to_ustd()
         elif self.currency == self.Currency.USDT:
             amount = self.amount
-        self.tg_user.process_payment(amount)
+        self.tg_user.process_payment(amount, BalanceEntry.Reason.TOPUP, topup=self)
         self.is_topped = True
         self.save(update_fields=("is_topped",))
 
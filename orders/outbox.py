@@ -0,0 +1,108 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bot.keyboards import KEYBOARDS
+from bot.tasks import send_notification_task
+from items.models import Item
+
+from .models import Order, OrderEvent
+from .tasks import process_order_task, relay_order_events_task
+
+logger = logging.getLogger(__name__)
+
+RELAY_BATCH_SIZE = 100
+MANUAL_CATEGORIES = (
+    Item.Category.OFFERS,
+    Item.Category.POPULARITY,
+    Item.Category.HOME_VOTE,
+    Item.Category.STARS,
+)
+
+
+def on_created(order: Order):
+    if order.category in MANUAL_CATEGORIES:
+        text = f"Complete order\n{order.admin_str()}\n by yourself"
+        logger.info(text)
+        order.send_manager_notification(text, keyboard=KEYBOARDS.MAKE_ORDER_COMLETED)
+    if order.category == Item.Category.DIAMOND:
+        process_order_task.delay(order.id)
+
+
+def on_completed(order: Order):
+    text = order.user_str()
+    logger.info(text)
+    send_notification_task.delay(order.tg_user.tg_id, text, message_id=order.message_id)
+    order.send_manager_notification(order.admin_str())
+
+
+def on_failed(order: Order):
+    text = f"{order.admin_str()}\nis failed"
+    logger.info(text)
+    order.send_manager_notification(text)
+    error_message = "ERROR🤬 Try redeeming the code mentioned in the last line"
+    if order.category == Item.Category.FREE_FIRE:
+        error_message = (
+            "❌ Unfortunately, there was an error with your order. "
+            "The funds have been returned to your balance."
+        )
+    send_notification_task.delay(
+        chat_id=order.tg_user.tg_id,
+        text=f"{error_message}\n\n{order.user_str()}",
+        message_id=order.message_id,
+    )
+
+
+def on_cancelled(order: Order):
+    send_notification_task.delay(order.tg_user.tg_id, text=order.user_str())
+
+
+EVENT_HANDLERS = {
+    Order.Status.PENDING: on_created,
+    Order.Status.COMPLETED: on_completed,
+    Order.Status.FAILED: on_failed,
+    Order.Status.CANCELLED: on_cancelled,
+}
+
+
+def relay_order_events(batch_size: int = RELAY_BATCH_SIZE) -> int:
+    """
+    Разбирает пачку необработанных событий заказов.
+    Возвращает количество успешно обработанных событий.
+    """
+    with transaction.atomic():
+        events = list(
+            OrderEvent.objects.select_for_update(skip_locked=True).filter(
+                processed_at__isnull=True, attempts__lt=OrderEvent.MAX_ATTEMPTS
+            )[:batch_size]
+        )
+        if not events:
+            return 0
+        orders = Order.objects.for_rendering().in_bulk(
+            {event.order_id for event in events}
+        )
+        processed, failed = [], []
+        for event in events:
+            handler = EVENT_HANDLERS.get(event.to_status)
+            try:
+                with transaction.atomic():
+                    if handler:
+                        handler(orders[event.order_id])
+            except Exception as e:
+                # Событие повторяется при следующих проходах, пока не исчерпает попытки
+                logger.exception(f"Failed to relay order event {event}: {e}")
+                failed.append(event.id)
+                OrderEvent.objects.filter(id=event.id).update(last_error=repr(e))
+                continue
+            processed.append(event.id)
+        OrderEvent.objects.filter(id__in=processed).update(
+            processed_at=timezone.now(), attempts=F("attempts") + 1
+        )
+        OrderEvent.objects.filter(id__in=failed).update(attempts=F("attempts") + 1)
+    return len(processed)
+
+
+async def schedule_order_events_relay():
+    relay_order_events_task.delay()
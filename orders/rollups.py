@@ -0,0 +1,129 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from codes.models import ArchivedCode, Giftcard, StockbleCode, UcCode
+from items.models import Item
+
+from .models import DailySalesRollup, Order
+
+CODE_COST_MODELS = {
+    Item.Category.PUBG_UC: UcCode,
+    Item.Category.CODES: StockbleCode,
+    Item.Category.GIFTCARD: Giftcard,
+}
+ROLLUP_FIELDS = (
+    "created_at",
+    "category",
+    "item_id",
+    "quantity",
+    "price",
+    "total_buying_cost",
+)
+
+
+def get_day_range(
+    start: date, end: date | None = None, field: str = "created_at"
+) -> dict[str, datetime]:
+    """Фильтр по дням в текущей таймзоне без __date, чтобы работал индекс по полю."""
+    tz = timezone.get_current_timezone()
+    return {
+        f"{field}__gte": datetime.combine(start, time.min, tz),
+        f"{field}__lt": datetime.combine((end or start) + timedelta(days=1), time.min, tz),
+    }
+
+
+def get_codes_cost(codes):
+    return Subquery(
+        codes.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(total=Sum("buying_cost"))
+        .values("total"),
+        output_field=DecimalField(),
+    )
+
+
+def with_buying_cost(orders):
+    """
+    Аннотирует себестоимость заказа. Суммы по кодам считаются подзапросами,
+    поэтому заказ с несколькими кодами не размножается JOIN'ами. Коды заказа
+    архивируются целиком, поэтому берётся сумма либо по рабочей таблице, либо по архиву.
+    """
+    code_costs = {
+        category: Coalesce(
+            get_codes_cost(model.objects.all()),
+            get_codes_cost(ArchivedCode.objects.filter(kind=model.kind)),
+            output_field=DecimalField(),
+        )
+        for category, model in CODE_COST_MODELS.items()
+    }
+    return orders.annotate(
+        total_buying_cost=Case(
+            *(When(category=category, then=cost) for category, cost in code_costs.items()),
+            default=F("item__buying_cost") * F("quantity"),
+            output_field=DecimalField(),
+        )
+    )
+
+
+def aggregate_orders(rows) -> dict[tuple, dict]:
+    totals = defaultdict(
+        lambda: {
+            "orders": 0,
+            "quantity": 0,
+            "turnover": Decimal(0),
+            "cost": Decimal(0),
+            "profit": Decimal(0),
+        }
+    )
+    for row in rows:
+        key = (timezone.localdate(row["created_at"]), row["category"], row["item_id"])
+        values = totals[key]
+        values["orders"] += 1
+        values["quantity"] += row["quantity"]
+        values["turnover"] += row["price"]
+        if row["total_buying_cost"] is not None:
+            values["cost"] += row["total_buying_cost"]
+            values["profit"] += row["price"] - row["total_buying_cost"]
+    return totals
+
+
+def record_completed_order(order_id: int):
+    """Добавляет завершённый заказ в дневные итоги; вызывается в транзакции перехода."""
+    rows = with_buying_cost(Order.objects.filter(id=order_id)).values(*ROLLUP_FIELDS)
+    for (day, category, item_id), values in aggregate_orders(rows).items():
+        rollup, _ = DailySalesRollup.objects.get_or_create(
+            day=day, category=category, item_id=item_id
+        )
+        DailySalesRollup.objects.filter(id=rollup.id).update(
+            **{field: F(field) + value for field, value in values.items()}
+        )
+
+
+def rebuild_rollups(start: date, end: date, chunk_size: int = 2000) -> int:
+    """Пересчитывает итоги за период с нуля. Возвращает число строк итогов."""
+    rows = (
+        with_buying_cost(
+            Order.objects.filter(
+                status=Order.Status.COMPLETED, **get_day_range(start, end)
+            )
+        )
+        .values(*ROLLUP_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    totals = aggregate_orders(rows)
+    with transaction.atomic():
+        DailySalesRollup.objects.filter(day__range=(start, end)).delete()
+        DailySalesRollup.objects.bulk_create(
+            [
+                DailySalesRollup(day=day, category=category, item_id=item_id, **values)
+                for (day, category, item_id), values in totals.items()
+            ],
+            batch_size=chunk_size,
+        )
+    return len(totals)
@@ -1,12 +1,14 @@
 import logging
+from dataclasses import dataclass
 from decimal import Decimal
 
 from asgiref.sync import sync_to_async
 from django.db import transaction
 
+from codes.models import Giftcard, StockbleCode
 from integrations.shop2topup import shop2topup_api
 from items.models import Item
-from users.models import TgUser
+from users.models import NegativeBalanceError, TgUser
 
 from .models import Order
 from .tasks import check_free_fire_order_status_task
@@ -38,15 +40,28 @@ class ItemNotActiveError(OrderCreationError):
     pass
 
 
-@sync_to_async
+@dataclass
+class PlacedOrder:
+    """Заказ вместе со всем, что нужно для ответа покупателю."""
+
+    order: Order
+    codes: list[StockbleCode | Giftcard]
+    text: str
+
+
 @transaction.atomic
-def create_order_service(
+def place_order(
     *,
     tg_user: TgUser,
     item: Item,
     quantity: int = 1,
     pubg_id: str | None = None,
-) -> Order:
+    message_id: int | None = None,
+) -> PlacedOrder:
+    """
+    Списывает баланс, создаёт заказ и резервирует коды в одной транзакции.
+    Если кодов не хватило, всё откатывается.
+    """
     if not item.is_active:
         raise ItemNotActiveError("This item is currently not available for purchase.")
 
@@ -58,32 +73,63 @@ def create_order_service(
         )
         quantity = 1
 
+    stock = item.get_available_amount(quantity)
+    if stock is not None and stock < quantity:
+        raise OutOfStockError(f"Not enough stock. Available: {stock}")
+
     price = item.price * quantity
     if price > tg_user.balance:
         raise InsufficientBalanceError("You do not have enough balance.")
 
-    stock = item.get_stock_amount()
-    if stock is not None and stock < quantity:
-        raise OutOfStockError(f"Not enough stock. Available: {stock}")
-
-    locked_user = TgUser.objects.select_for_update().get(id=tg_user.id)
-
-    order = Order.objects.create(
-        tg_user=locked_user,
-        item=item,
-        quantity=quantity,
-        data=item.to_dict(),
-        price=price,
-        category=item.category,
-        pubg_id=pubg_id,
-        balance_before=locked_user.balance,
-    )
+    try:
+        # Баланс окончательно проверяет условный UPDATE при списании
+        order = Order.objects.create(
+            tg_user=tg_user,
+            item=item,
+            quantity=quantity,
+            data=item.to_dict(),
+            price=price,
+            category=item.category,
+            pubg_id=pubg_id,
+            message_id=message_id,
+        )
+    except NegativeBalanceError as e:
+        raise InsufficientBalanceError("You do not have enough balance.") from e
 
     logger.info(f"Order #{order.id} created for user {tg_user.tg_id} via service.")
 
-    order.grab_codes()
+    # Остаток в Redis лишь подсказка, окончательно наличие решает резервирование,
+    # а при его неудаче откатывается вся покупка вместе со списанием
+    codes = order.grab_codes()
+    if item.category == Item.Category.PUBG_UC:
+        if not codes:
+            raise OutOfStockError("Not enough codes for this item.")
+        # UC-коды активируются на аккаунт, покупателю они не отправляются
+        codes = []
+    elif is_stockable:
+        if len(codes) != quantity:
+            raise OutOfStockError(f"Not enough stock. Available: {len(codes)}")
+    else:
+        codes = []
+
+    return PlacedOrder(order=order, codes=codes, text=order.user_str())
 
-    return order
+
+async def aplace_order(**kwargs) -> PlacedOrder:
+    return await sync_to_async(place_order)(**kwargs)
+
+
+@sync_to_async
+def create_order_service(
+    *,
+    tg_user: TgUser,
+    item: Item,
+    quantity: int = 1,
+    pubg_id: str | None = None,
+) -> Order:
+    return place_order(
+        tg_user=tg_user, item=item, quantity=quantity, pubg_id=pubg_id
+    ).order
 
 
 @sync_to_async
@@ -100,25 +146,22 @@ def create_free_fire_order(
     item = Item.objects.get(id=item_id)
     price_decimal = Decimal(str(price))
 
-    locked_user = TgUser.objects.select_for_update().get(id=tg_user.id)
-
-    if locked_user.balance < price_decimal:
+    try:
+        order = Order.objects.create(
+            tg_user=tg_user,
+            item=item,
+            quantity=1,
+            data=item.to_dict(),
+            price=price_decimal,
+            category=Item.Category.FREE_FIRE,
+            pubg_id=player_id,
+            player_name=player_name,
+            is_completed=None,
+        )
+    except NegativeBalanceError:
         logger.error(f"User {tg_user.tg_id} balance check failed inside transaction.")
         return None
 
-    order = Order.objects.create(
-        tg_user=locked_user,
-        item=item,
-        quantity=1,
-        data=item.to_dict(),
-        price=price_decimal,
-        category=Item.Category.FREE_FIRE,
-        pubg_id=player_id,
-        player_name=player_name,
-        balance_before=locked_user.balance,
-        is_completed=None,
-    )
-
     import asyncio
 
     provider_trx_id = asyncio.run(
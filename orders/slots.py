@@ -0,0 +1,19 @@
+import logging
+from decimal import Decimal
+
+from backend.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+TOPUP_SLOT_STEP = Decimal("0.001")
+TOPUP_MAX_SLOTS = 999
+TOPUP_SLOT_KEY = "topup_slot:{to_pay}"
+
+
+def reserve_slot(to_pay: Decimal, ttl: int) -> bool:
+    """Занимает сумму к оплате, если её не занял никто другой."""
+    return bool(redis_client.set(TOPUP_SLOT_KEY.format(to_pay=to_pay), 1, nx=True, ex=ttl))
+
+
+def release_slot(to_pay: Decimal):
+    redis_client.delete(TOPUP_SLOT_KEY.format(to_pay=to_pay))
@@ -3,7 +3,6 @@ import logging
 from celery.exceptions import Retry
 
 from backend.celery import app
-from bot.tasks import send_notification_task
 from integrations.shop2topup import shop2topup_api
 from items.models import Item
 
@@ -22,6 +21,15 @@ def process_order_task(order_id):
         process_diamond(order)
 
 
+@app.task()
+def relay_order_events_task():
+    """Доставляет побочные эффекты переходов заказов пачками."""
+    from .outbox import RELAY_BATCH_SIZE, relay_order_events
+
+    while relay_order_events() >= RELAY_BATCH_SIZE:
+        pass
+
+
 @app.task(bind=True, max_retries=10)
 def check_free_fire_order_status_task(self, order_id):
     import asyncio
@@ -54,12 +62,7 @@ def check_free_fire_order_status_task(self, order_id):
 
         status = status_info.get("status")
         if status == "DONE":
-            order.is_completed = True
-            order.save()
-            send_notification_task.delay(
-                order.tg_user.tg_id,
-                f"✅ Success! Your order for {order.item.title} has been completed.",
-            )
+            order.transition(Order.Status.COMPLETED)
             logger.info(f"Order {order_id} completed successfully.")
 
         elif status in ["PROCESSING", "TRX_NOT_READY"]:
@@ -79,14 +82,7 @@ def check_free_fire_order_status_task(self, order_id):
     except Exception as e:
         logger.error(f"Error checking status for order {order_id}: {e}")
         try:
-            order_to_fail = Order.objects.get(id=order_id)
-            if order_to_fail.is_completed is None:
-                order_to_fail.is_completed = False
-                order_to_fail.save()
-                order_to_fail.tg_user.process_payment(order_to_fail.price)
-                send_notification_task.delay(
-                    order_to_fail.tg_user.tg_id,
-                    f"❌ Unfortunately, there was an error with your order for {order_to_fail.item.title}. The funds have been returned to your balance.",
-                )
+            order_to_fail = Order.objects.select_related("tg_user").get(id=order_id)
+            order_to_fail.transition(Order.Status.FAILED, refund=True)
         except Order.DoesNotExist:
             logger.error(f"Could not fail order {order_id} as it was not found.")
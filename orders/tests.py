@@ -0,0 +1,142 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from admin_panel.models import ManagerChat
+from backend.config import PAYMENT_CONFIG
+from codes.models import UcCode
+from items.models import Item
+from users.models import TgUser
+
+from .models import Order, OrderEvent, TopUp
+from .outbox import EVENT_HANDLERS, relay_order_events
+
+
+class OrderRenderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        chat = ManagerChat.objects.create(title="Managers", tg_id=-100)
+        item = Item.objects.create(
+            category=Item.Category.PUBG_UC,
+            price=Decimal("1.00"),
+            amount=60,
+            is_active=True,
+            chat=chat,
+        )
+        tg_user = TgUser.objects.create(tg_id=1, balance=Decimal("10.00"))
+        cls.order = Order.objects.create(
+            tg_user=tg_user,
+            item=item,
+            quantity=2,
+            data={"amount": 60, "value": "60 UC"},
+            price=Decimal("2.00"),
+            category=Item.Category.PUBG_UC,
+        )
+        for code in ("UC-1", "UC-2"):
+            UcCode.objects.create(code=code, amount=60, order=cls.order)
+
+    def test_for_rendering_renders_without_queries(self):
+        order = Order.objects.for_rendering().get(id=self.order.id)
+        with self.assertNumQueries(0):
+            user_text = order.user_str()
+            admin_text = order.admin_str()
+        self.assertIn("Code USED: UC-1 UC-2", user_text)
+        self.assertIn("userid: 1", admin_text)
+
+    def test_load_for_rendering_fetches_relations_once(self):
+        order = Order.objects.get(id=self.order.id)
+        # item, chat, tg_user и коды
+        with self.assertNumQueries(4):
+            order.user_str()
+        with self.assertNumQueries(0):
+            order.admin_str()
+            order.user_str()
+
+
+class TopUpSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tg_user = TgUser.objects.create(tg_id=1, balance=Decimal("0.00"))
+        # Сумма к оплате задана заранее, чтобы не подбирать слот в Redis
+        cls.topup = TopUp.objects.create(
+            tg_user=cls.tg_user,
+            amount=Decimal("1000"),
+            comission=Decimal("10"),
+            to_pay=Decimal("1010"),
+            currency=TopUp.Currency.RUB,
+        )
+
+    def test_paid_topup_is_topped_without_refetching_row(self):
+        topup = TopUp.objects.select_related("tg_user").get(id=self.topup.id)
+        # Курс читается из liveconfigs заранее, чтобы не попасть в подсчёт
+        amount = topup.convert_to_ustd()
+        topup.is_paid = True
+        # Зачисление с записью в журнал (savepoint), UPDATE is_topped и самой строки,
+        # старая строка повторно не читается
+        with self.assertNumQueries(6):
+            topup.save()
+        self.tg_user.refresh_from_db()
+        self.assertEqual(self.tg_user.balance, amount)
+        self.assertTrue(topup.is_topped)
+
+    def test_repeated_save_does_not_top_again(self):
+        topup = TopUp.objects.select_related("tg_user").get(id=self.topup.id)
+        topup.convert_to_ustd()
+        topup.is_paid = True
+        topup.save()
+        with self.assertNumQueries(1):
+            topup.save()
+        self.tg_user.refresh_from_db()
+        self.assertEqual(self.tg_user.balance, topup.convert_to_ustd())
+
+    def test_comission_takes_lowest_free_slot(self):
+        # Первый слот занят другим пополнением, второй свободен
+        with mock.patch("orders.models.reserve_slot", side_effect=[False, True, True]):
+            first = TopUp(tg_user=self.tg_user, amount=Decimal("50"))
+            first.generate_comission()
+            second = TopUp(tg_user=self.tg_user, amount=Decimal("50"))
+            second.generate_comission()
+        base = Decimal(str(PAYMENT_CONFIG.TOPUP_COMISSION))
+        self.assertEqual(first.comission, base + Decimal("0.002"))
+        # Без других открытых пополнений надбавка снова минимальная
+        self.assertEqual(second.comission, base + Decimal("0.001"))
+
+
+class RelayOrderEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        item = Item.objects.create(
+            category=Item.Category.PUBG_UC, price=Decimal("1.00"), amount=60
+        )
+        tg_user = TgUser.objects.create(tg_id=1, balance=Decimal("10.00"))
+        cls.order = Order.objects.create(
+            tg_user=tg_user,
+            item=item,
+            quantity=1,
+            data={"amount": 60},
+            price=Decimal("1.00"),
+            category=Item.Category.PUBG_UC,
+        )
+
+    def test_failing_event_is_retried_up_to_the_cap(self):
+        failing = mock.Mock(side_effect=RuntimeError("chat not found"))
+        with (
+            mock.patch.dict(EVENT_HANDLERS, {Order.Status.PENDING: failing}),
+            self.assertLogs("orders.outbox", "ERROR"),
+        ):
+            for _ in range(OrderEvent.MAX_ATTEMPTS + 2):
+                relay_order_events()
+        self.assertEqual(failing.call_count, OrderEvent.MAX_ATTEMPTS)
+        event = self.order.events.get()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, OrderEvent.MAX_ATTEMPTS)
+        self.assertIn("chat not found", event.last_error)
+
+    def test_processed_event_is_not_relayed_again(self):
+        handler = mock.Mock()
+        with mock.patch.dict(EVENT_HANDLERS, {Order.Status.PENDING: handler}):
+            self.assertEqual(relay_order_events(), 1)
+            self.assertEqual(relay_order_events(), 0)
+        handler.assert_called_once()
+        self.assertIsNotNone(self.order.events.get().processed_at)
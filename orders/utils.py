@@ -32,8 +32,7 @@ def process_diamond(order: Order):
         user_id, zone_id = get_user_zone_id(order.pubg_id)
         succ, msg = so_api.create_order(item.data.get('product'), item.data.get('id'), user_id, zone_id)
         logger.debug(msg)
-        order.is_completed = succ
-        order.save(update_fields=('is_completed',))
+        order.transition(Order.Status.COMPLETED if succ else Order.Status.FAILED)
         if not succ:
             text = f'Activation of order {order.id} failed\nServer response: {msg}'
             logger.error(f'{text}')
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import WebhookEvent
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ("provider", "event_id", "attempts", "created_at", "processed_at")
+    list_filter = ("provider",)
+    search_fields = ("event_id",)
+    readonly_fields = (
+        "provider",
+        "event_id",
+        "payload",
+        "attempts",
+        "error",
+        "created_at",
+        "processed_at",
+    )
@@ -0,0 +1,35 @@
+import logging
+from time import time
+
+from backend.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Окно, которое биржи отдают за один полный проход
+FULL_WINDOW = 1000 * 60 * 60 * 24
+# Депозит может стать успешным позже своего времени, поэтому окно перекрывается
+CURSOR_OVERLAP = 1000 * 60 * 30
+SWEEP_INTERVAL = 60 * 60
+CURSOR_KEY = "wallet_cursor:{source}"
+SWEEP_KEY = "wallet_sweep:{source}"
+
+
+def get_start_time(source: str) -> int:
+    """Начало окна опроса в мс: от курсора или полный проход раз в SWEEP_INTERVAL."""
+    full_window_start = int(time() * 1000) - FULL_WINDOW
+    if redis_client.set(SWEEP_KEY.format(source=source), 1, nx=True, ex=SWEEP_INTERVAL):
+        logger.info(f"{source}: full window sweep")
+        return full_window_start
+    cursor = redis_client.get(CURSOR_KEY.format(source=source))
+    if not cursor:
+        return full_window_start
+    return max(int(cursor) - CURSOR_OVERLAP, full_window_start)
+
+
+def save_cursor(source: str, timestamps: list[int | str]):
+    if not timestamps:
+        return
+    key = CURSOR_KEY.format(source=source)
+    latest = max(int(timestamp) for timestamp in timestamps)
+    if latest > int(redis_client.get(key) or 0):
+        redis_client.set(key, latest)
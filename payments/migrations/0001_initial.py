@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-19 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('fars', 'FARS'), ('codeepay', 'Codeepay')], max_length=20, verbose_name='Provider')),
+                ('event_id', models.CharField(max_length=255, verbose_name='Event id')),
+                ('payload', models.JSONField(verbose_name='Payload')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')),
+                ('error', models.TextField(blank=True, verbose_name='Last error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creation date')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Processed at')),
+            ],
+            options={
+                'verbose_name': 'Webhook event',
+                'verbose_name_plural': 'Webhook events',
+                'ordering': ('id',),
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='webhook_event_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'event_id'), name='webhook_event_unique')],
+            },
+        ),
+    ]
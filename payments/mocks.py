@@ -99,7 +99,7 @@ def mock_get_binance_updates():
     return [("10.123", "mock_tx_binance_12345")]
 
 
-def mock_get_bybit_updates():
+def mock_get_bybit_updates(deadline=None):
     """Мок для получения депозитов с ByBit."""
     logger.warning("[MOCK] BYBIT: Проверка 'депозитов'")
     return [("25.456", "mock_tx_bybit_67890")]
@@ -0,0 +1,43 @@
+from django.db import models
+
+
+class WebhookEvent(models.Model):
+    """Входящие вебхуки: сохраняются сразу, обрабатываются фоном пачками."""
+
+    class Provider(models.TextChoices):
+        FARS = "fars", "FARS"
+        CODEEPAY = "codeepay", "Codeepay"
+
+    MAX_ATTEMPTS = 5
+
+    provider = models.CharField(
+        max_length=20, choices=Provider, verbose_name="Provider"
+    )
+    event_id = models.CharField(max_length=255, verbose_name="Event id")
+    payload = models.JSONField(verbose_name="Payload")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Attempts")
+    error = models.TextField(blank=True, verbose_name="Last error")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
+    processed_at = models.DateTimeField(
+        blank=True, null=True, verbose_name="Processed at"
+    )
+
+    class Meta:
+        verbose_name = "Webhook event"
+        verbose_name_plural = "Webhook events"
+        ordering = ("id",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("provider", "event_id"), name="webhook_event_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=("id",),
+                condition=models.Q(processed_at__isnull=True),
+                name="webhook_event_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider}:{self.event_id}"
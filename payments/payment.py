@@ -1,13 +1,18 @@
+import asyncio
 import logging
+from decimal import Decimal
 from time import time
 
 import aiohttp
 from binance.spot import Spot
+from django.db import transaction
 from pybit.unified_trading import HTTP
 
 from backend.config import PAYMENT_CONFIG
 from backend.settings import ENV
 from orders.models import TopUp
+from payments.cursors import get_start_time, save_cursor
+from payments.webhooks import get_codeepay_signature
 from users.models import TgUser
 from asgiref.sync import sync_to_async
 
@@ -17,6 +22,8 @@ BOT_URL = ENV.str('BOT_URL')
 SHOP_NAME = ENV.str('SHOP_NAME')
 
 MIN_PRICE = 100
+# Опрос бирж запускается раз в минуту и должен успеть до следующего запуска
+WALLET_POLL_BUDGET = 40
 
 
 logger = logging.getLogger(__name__)
@@ -27,60 +34,112 @@ session = HTTP(testnet=False, api_key=ENV.str('BYBIT_API_KEY'), api_secret=ENV.s
 
 def get_binance_updates():
     timestamp = int((time()) * 1000)
-    startTime = timestamp - 1000 * 60 * 60 * 24
+    startTime = get_start_time('binance')
     try:
         logger.warning("BINANCE_DEBUG: Trying get_binance_updates")
         history = client.deposit_history(status=1, coin='USDT', startTime=startTime, timestamp=timestamp)
         logger.warning(f"BINANCE_DEBUG: Raw response from Binance API: {history}")
-        return [(row['amount'], row['txId']) for row in history if row['status'] == 1]
+        rows = [row for row in history if row['status'] == 1]
+        save_cursor('binance', [row['insertTime'] for row in rows])
+        return [(row['amount'], row['txId']) for row in rows]
     except Exception as e:
         logger.error(f"BINANCE_DEBUG: Exception in get_binance_updates: {e}", exc_info=True)
         return []
 
 
-def get_bybit_updates():
-    startTime = int((time() - 60 * 60 * 24) * 1000)
-    result = []
+def get_bybit_records(source, get_records, success_status, time_field, deadline=None):
+    startTime = get_start_time(source)
+    rows = []
     try:
         cursor = None
         while True:
-            response = session.get_deposit_records(coin='USDT', startTime=startTime, cursor=cursor)
-            result.extend([(row['amount'], row['txID']) for row in response['result']['rows'] if row['status'] == 3])
-            logger.debug(f'bybit response {response}')
-            cursor = response['result']['nextPageCursor']
-            if cursor is None or cursor == '':
-                break
-        logger.debug(f'{result=}')
-    except Exception as e:
-        logger.error(e)
-    try:
-        cursor = None
-        while True:
-            response = session.get_internal_deposit_records(coin='USDT', startTime=startTime, cursor=cursor)
-            result.extend([(row['amount'], row['txID']) for row in response['result']['rows'] if row['status'] == 2])
+            response = get_records(coin='USDT', startTime=startTime, cursor=cursor)
+            rows.extend([row for row in response['result']['rows'] if row['status'] == success_status])
             logger.debug(f'bybit response {response}')
             cursor = response['result']['nextPageCursor']
             if cursor is None or cursor == '':
                 break
+            if deadline and time() > deadline:
+                # Курсор не двигаем, пропущенные страницы заберёт следующий опрос
+                logger.warning('Bybit polling is out of time budget, rest pages are skipped')
+                return [(row['amount'], row['txID']) for row in rows]
+        save_cursor(source, [row[time_field] for row in rows])
     except Exception as e:
         logger.error(e)
+    return [(row['amount'], row['txID']) for row in rows]
+
+
+def get_bybit_updates(deadline: float | None = None):
+    result = [
+        *get_bybit_records('bybit', session.get_deposit_records, 3, 'successAt', deadline),
+        *get_bybit_records(
+            'bybit_internal', session.get_internal_deposit_records, 2, 'createdTime', deadline
+        ),
+    ]
     logger.debug(f'{result=}')
     return result
 
 
-async def check_wallets():
-    result = [*get_binance_updates(), *get_bybit_updates()]
-    for amount, txId in result:
-        if await TopUp.objects.filter(tx_id=txId).aexists():
-            logger.debug('This payment has been already proceed')
-            continue
-        topup = await TopUp.objects.filter(to_pay=amount, is_paid=False).afirst()
-        if topup:
+def reconcile_deposits(deposits: list[tuple[str, str]]) -> int:
+    """
+    Сопоставляет депозиты с открытыми пополнениями за два запроса
+    и зачисляет найденные в одной транзакции. Возвращает число зачислений.
+    """
+    amounts = {}
+    for amount, tx_id in deposits:
+        amounts[tx_id] = Decimal(str(amount)).quantize(Decimal('0.001'))
+    processed = set(
+        TopUp.objects.filter(tx_id__in=amounts).values_list('tx_id', flat=True)
+    )
+    new_deposits = {tx_id: amount for tx_id, amount in amounts.items() if tx_id not in processed}
+    if not new_deposits:
+        return 0
+    open_topups = {}
+    for topup in TopUp.objects.filter(
+        to_pay__in=set(new_deposits.values()), is_paid=False
+    ).select_related('tg_user'):
+        open_topups.setdefault(topup.to_pay, topup)
+    matches = []
+    for tx_id, amount in new_deposits.items():
+        if topup := open_topups.pop(amount, None):
+            matches.append((topup, tx_id))
+    if not matches:
+        return 0
+    with transaction.atomic():
+        for topup, tx_id in matches:
             logger.info(f'Found topup {topup}')
             topup.is_paid = True
-            topup.tx_id = txId
-            await topup.atop()
-            await topup.asave(update_fields=('is_paid', 'tx_id'))
+            topup.tx_id = tx_id
+            topup.top()
+            topup.save(update_fields=('is_paid', 'tx_id', 'paid_at'))
+    return len(matches)
+
+
+async def get_wallet_updates() -> list[tuple[str, str]]:
+    """Опрашивает биржи параллельно в потоках, не блокируя event loop бота."""
+    deadline = time() + WALLET_POLL_BUDGET
+    polls = {
+        'binance': asyncio.to_thread(get_binance_updates),
+        'bybit': asyncio.to_thread(get_bybit_updates, deadline),
+    }
+    responses = await asyncio.gather(
+        *(asyncio.wait_for(poll, WALLET_POLL_BUDGET) for poll in polls.values()),
+        return_exceptions=True,
+    )
+    result = []
+    for exchange, response in zip(polls, responses):
+        if isinstance(response, Exception):
+            logger.error(f'{exchange} polling failed: {response!r}')
+            continue
+        result.extend(response)
+    return result
+
+
+async def check_wallets():
+    result = await get_wallet_updates()
+    paid = await sync_to_async(reconcile_deposits)(result)
+    if paid:
+        logger.info(f'{paid} topups have been paid')
 
 
 async def create_codeepay_payment(tg_user: TgUser, to_pay: int):
@@ -95,7 +154,7 @@ async def create_codeepay_payment(tg_user: TgUser, to_pay: int):
         to_pay=to_pay,
         currency=TopUp.Currency.RUB,
     )
-    callback_url = f'{BASE_IP}/webhook/codeepay/'
+    callback_url = f'{BASE_IP}/webhook/codeepay/?signature={get_codeepay_signature(topup.id)}'
     headers = {
         'Content-Type': 'application/json',
         'X-Api-Key': CODEEPAY_API_KEY
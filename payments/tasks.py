@@ -0,0 +1,14 @@
+import logging
+
+from backend.celery import app
+
+logger = logging.getLogger(__name__)
+
+
+@app.task()
+def process_webhook_events_task():
+    """Разбирает входящие вебхуки пачками."""
+    from .webhooks import WEBHOOK_BATCH_SIZE, process_webhook_events
+
+    while process_webhook_events() >= WEBHOOK_BATCH_SIZE:
+        pass
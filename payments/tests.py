@@ -0,0 +1,64 @@
+import importlib
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from orders.models import TopUp
+from users.models import TgUser
+
+from . import webhooks
+from .models import WebhookEvent
+
+
+class WebhooksImportTests(SimpleTestCase):
+    def test_modules_import(self):
+        # Модуль тянут urls и runbot: ошибка чтения настроек ломает их запуск
+        for module in ("payments.webhooks", "payments.views", "payments.tasks"):
+            importlib.import_module(module)
+
+
+class SignatureCutoverTests(SimpleTestCase):
+    def test_unset_cutover_refuses_legacy_callbacks(self):
+        with mock.patch.object(webhooks, "CODEEPAY_SIGNATURE_CUTOVER", ""):
+            self.assertIsNone(webhooks.get_signature_cutover())
+            self.assertFalse(webhooks.is_legacy_codeepay_callback(1, "100"))
+
+    def test_naive_cutover_is_made_aware(self):
+        with mock.patch.object(
+            webhooks, "CODEEPAY_SIGNATURE_CUTOVER", "2026-10-19T12:00:00"
+        ):
+            cutover = webhooks.get_signature_cutover()
+        self.assertEqual(
+            cutover, timezone.make_aware(datetime(2026, 10, 19, 12, 0))
+        )
+
+
+class ProcessWebhookEventsTests(TestCase):
+    def test_failed_events_are_not_counted(self):
+        WebhookEvent.objects.create(
+            provider=WebhookEvent.Provider.CODEEPAY, event_id="broken", payload={}
+        )
+        self.assertEqual(webhooks.process_webhook_events(), 0)
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIsNone(event.processed_at)
+
+    def test_codeepay_event_stores_paid_at(self):
+        tg_user = TgUser.objects.create(tg_id=1)
+        # Сумма к оплате задана заранее, чтобы не подбирать слот в Redis
+        topup = TopUp.objects.create(
+            tg_user=tg_user,
+            amount=Decimal("1000"),
+            comission=Decimal("10"),
+            to_pay=Decimal("1010"),
+            currency=TopUp.Currency.RUB,
+        )
+        webhooks.handle_codeepay_event(
+            {"metadata": {"order_id": topup.id}, "amount": "1010", "final_amount": "1010"}
+        )
+        topup.refresh_from_db()
+        self.assertTrue(topup.is_paid)
+        self.assertIsNotNone(topup.paid_at)
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from backend.settings import ENV
+from codes.models import UcCode
+from codes.tasks import process_results
+from orders.models import TopUp
+
+from .models import WebhookEvent
+from .tasks import process_webhook_events_task
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH_SIZE = 100
+MIN_PERCENT = 10
+FARS_WEBHOOK_TOKEN = ENV.str("FARS_WEBHOOK_TOKEN", default="")
+# Пополнения, созданные до этого момента, могут прислать вебхук без подписи.
+# Если не задано, неподписанные вебхуки Codeepay не принимаются
+CODEEPAY_SIGNATURE_CUTOVER = ENV.str("CODEEPAY_SIGNATURE_CUTOVER", default="")
+
+
+def get_codeepay_signature(topup_id: int) -> str:
+    """Подпись для notification_url: Codeepay вернёт её в запросе вебхука."""
+    return salted_hmac("codeepay-webhook", str(topup_id)).hexdigest()
+
+
+def verify_codeepay_signature(topup_id, signature: str | None) -> bool:
+    return bool(signature) and constant_time_compare(
+        get_codeepay_signature(topup_id), signature
+    )
+
+
+def get_signature_cutover():
+    """Момент выкатки подписей Codeepay, задаётся явно в CODEEPAY_SIGNATURE_CUTOVER."""
+    if not CODEEPAY_SIGNATURE_CUTOVER:
+        return None
+    cutover = datetime.fromisoformat(CODEEPAY_SIGNATURE_CUTOVER)
+    if timezone.is_naive(cutover):
+        cutover = timezone.make_aware(cutover)
+    return cutover
+
+
+def is_legacy_codeepay_callback(topup_id, amount) -> bool:
+    """
+    Пополнения, созданные до выкатки, получили notification_url без подписи.
+    Их вебхук принимается, только если пополнение ещё открыто и сумма совпадает.
+    """
+    cutover = get_signature_cutover()
+    if cutover is None:
+        return False
+    try:
+        amount = Decimal(str(amount))
+    except InvalidOperation:
+        return False
+    return TopUp.objects.filter(
+        id=topup_id,
+        currency=TopUp.Currency.RUB,
+        is_paid=False,
+        created_at__lt=cutover,
+        to_pay=amount,
+    ).exists()
+
+
+def verify_fars_token(token: str | None) -> bool:
+    # FARS не подписывает запросы, поэтому проверяем общий токен из URL, если он задан
+    if not FARS_WEBHOOK_TOKEN:
+        return True
+    return bool(token) and constant_time_compare(FARS_WEBHOOK_TOKEN, token)
+
+
+def get_event_id(payload: dict, *keys: str) -> str:
+    """Ключ события из всех полей keys, а если какого-то нет, хэш всего payload."""
+    if keys and all(payload.get(key) for key in keys):
+        return ":".join(str(payload[key]) for key in keys)
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def store_event(provider: WebhookEvent.Provider, event_id: str, payload: dict):
+    """Сохраняет событие; повторная доставка того же события игнорируется."""
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(provider=provider, event_id=event_id, payload=payload)],
+        ignore_conflicts=True,
+    )
+    process_webhook_events_task.delay()
+
+
+# Статусы и причины FARS
+# Status
+# 0"CREATED"
+# 1"PROCESSING"
+# 2"RESTART"
+# 3"PENDING"
+# 4"DEFERRED"
+# 5"FAILED"
+# 6"REDEEMED"
+# 7"REJECTED"
+# 8"CANCELLED"
+
+# StatusReason
+# 0"SITE_ERROR"
+# 1"SERVER_ERROR"
+# 2"ACCOUNT_BLOCKED"
+# 3"RISK_ID_CONTROL"
+# 4"NO_CODES"
+# 5"INVALID_CODE"
+# 6"UNMATCHED_CODE_AMOUNT"
+# 7"INVALID_PUBG_ID"
+# 8"DECOMPOSE_ERROR"
+# 9"NO_LINKED_ACCOUNT"
+# 10"TOO_LARGE_ORDER_AMOUNT"
+# 11"TOO_MANY_REDEEM_ATTEMPTS"
+
+
+def handle_fars_event(payload: dict):
+    _status = payload['status']
+    codes = list(
+        UcCode.objects.filter(code__in=payload['codes'].keys()).only(
+            'id', 'code', 'amount', 'order_id'
+        )
+    )
+    if missing := payload['codes'].keys() - {code.code for code in codes}:
+        logger.warning(f'Коды {", ".join(missing)} не найдены в базе')
+    if not codes:
+        return
+    succ = None
+    if _status in ('REDEEMED',):
+        succ = True
+    elif _status in ('DEFERRED', 'FAILED', 'REJECTED', 'CANCELLED'):
+        succ = False
+    if succ is None:
+        UcCode.objects.filter(id__in=[code.id for code in codes]).update(status=_status)
+        return
+    process_results(codes, succ, _status)
+
+
+def handle_codeepay_event(payload: dict):
+    order_id = payload['metadata']['order_id']
+    if float(payload['final_amount']) / float(payload['amount']) <= MIN_PERCENT / 100:
+        return
+    topup = TopUp.objects.filter(id=order_id).first()
+    if not topup:
+        logger.warning(f'Пополнение {order_id} из вебхука Codeepay не найдено')
+        return
+    topup.is_paid = True
+    topup.save(update_fields=('is_paid', 'paid_at'))
+
+
+EVENT_HANDLERS = {
+    WebhookEvent.Provider.FARS: handle_fars_event,
+    WebhookEvent.Provider.CODEEPAY: handle_codeepay_event,
+}
+
+
+def process_webhook_events(batch_size: int = WEBHOOK_BATCH_SIZE) -> int:
+    """
+    Обрабатывает пачку сохранённых вебхуков.
+    Возвращает количество успешно обработанных событий: неудачные ждут
+    следующего запуска, а не повторяются подряд в том же.
+    """
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True).filter(
+                processed_at__isnull=True, attempts__lt=WebhookEvent.MAX_ATTEMPTS
+            )[:batch_size]
+        )
+        processed, failed = [], []
+        for event in events:
+            try:
+                with transaction.atomic():
+                    EVENT_HANDLERS[event.provider](event.payload)
+            except Exception as e:
+                logger.exception(f'Failed to process webhook event {event}: {e}')
+                failed.append(event.id)
+                WebhookEvent.objects.filter(id=event.id).update(error=repr(e))
+                continue
+            processed.append(event.id)
+        WebhookEvent.objects.filter(id__in=processed).update(
+            processed_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        WebhookEvent.objects.filter(id__in=failed).update(attempts=F('attempts') + 1)
+    return len(processed)
+
+
+async def schedule_webhook_events_processing():
+    process_webhook_events_task.delay()
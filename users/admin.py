@@ -1,6 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-from .models import TgUser
+from .models import BalanceEntry, NegativeBalanceError, TgUser
 
 
 @admin.register(TgUser)
@@ -13,6 +13,68 @@ class TgUserAdmin(admin.ModelAdmin):
         "balance",
         "points",
         "is_admin",
+        "delivery_state",
         "created_at",
         "updated_at",
     )
+    list_filter = ("delivery_state",)
+
+    def save_model(self, request, obj, form, change):
+        """
+        Правка баланса и баллов проводится через журнал как корректировка.
+        Сдвиг считается от значений, показанных в форме, чтобы не откатить
+        списания и пополнения, прошедшие, пока форма была открыта.
+        """
+        balance_delta = points_delta = 0
+        if "balance" in form.changed_data:
+            balance_delta = obj.balance - form.initial.get("balance", 0)
+        if "points" in form.changed_data:
+            points_delta = obj.points - form.initial.get("points", 0)
+        if change:
+            fields = [
+                field
+                for field in form.changed_data
+                if field not in ("balance", "points")
+            ]
+            if fields:
+                obj.save(update_fields=fields)
+            obj.refresh_from_db(fields=("balance", "points"))
+        else:
+            obj.balance, obj.points = 0, 0
+            obj.save()
+        if balance_delta or points_delta:
+            try:
+                obj.apply_balance_change(
+                    balance_delta,
+                    BalanceEntry.Reason.ADJUSTMENT,
+                    points=points_delta,
+                )
+            except NegativeBalanceError as e:
+                self.message_user(request, str(e), messages.ERROR)
+
+
+@admin.register(BalanceEntry)
+class BalanceEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "tg_user",
+        "reason",
+        "amount",
+        "points",
+        "balance_after",
+        "order",
+        "topup",
+        "created_at",
+    )
+    list_filter = ("reason",)
+    search_fields = ("tg_user__tg_id", "tg_user__username")
+    list_select_related = ("tg_user",)
+    raw_id_fields = ("tg_user", "order", "topup")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -8,4 +8,5 @@ class UsersConfig(AppConfig):
 
     def ready(self) -> None:
         from backend import config  # NOQA
+        import users.signals  # NOQA
         return super().ready()
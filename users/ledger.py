@@ -0,0 +1,130 @@
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BalanceEntry, BalanceSnapshot, TgUser
+
+logger = logging.getLogger(__name__)
+
+COMPACT_BATCH_SIZE = 1000
+
+
+@dataclass
+class BalanceMismatch:
+    tg_user_id: int
+    balance: Decimal
+    points: int
+    ledger_balance: Decimal
+    ledger_points: int
+
+    def __str__(self):
+        return (
+            f"User {self.tg_user_id}: balance {self.balance} != {self.ledger_balance}, "
+            f"points {self.points} != {self.ledger_points}"
+        )
+
+
+def get_uncompacted_entries():
+    """Записи журнала, ещё не вошедшие в снимок своего пользователя."""
+    return BalanceEntry.objects.filter(compacted_at__isnull=True)
+
+
+def compact_balances(batch_size: int = COMPACT_BATCH_SIZE) -> int:
+    """
+    Сворачивает новые записи журнала в снимки пользователей.
+    Возвращает число обновлённых снимков.
+    """
+    user_ids = list(
+        get_uncompacted_entries()
+        .values_list("tg_user_id", flat=True)
+        .distinct()
+        .order_by("tg_user_id")
+    )
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        with transaction.atomic():
+            # Записи выбираются после блокировки снимков, чтобы параллельный запуск
+            # не свернул одни и те же записи дважды
+            snapshots = BalanceSnapshot.objects.select_for_update().in_bulk(
+                batch, field_name="tg_user_id"
+            )
+            # Отмечаются ровно те записи, что вошли в сумму: запись, закоммиченная
+            # позже, останется несвёрнутой до следующего запуска
+            entries = list(
+                get_uncompacted_entries()
+                .filter(tg_user_id__in=batch)
+                .values_list("id", "tg_user_id", "amount", "points")
+            )
+            now = timezone.now()
+            existing = list(snapshots.values())
+            new = []
+            for _, tg_user_id, amount, points in entries:
+                snapshot = snapshots.get(tg_user_id)
+                if snapshot is None:
+                    snapshot = snapshots[tg_user_id] = BalanceSnapshot(
+                        tg_user_id=tg_user_id
+                    )
+                    new.append(snapshot)
+                snapshot.balance += amount
+                snapshot.points += points
+                snapshot.updated_at = now
+            BalanceSnapshot.objects.bulk_create(new)
+            BalanceSnapshot.objects.bulk_update(
+                existing, ("balance", "points", "updated_at")
+            )
+            entry_ids = [entry[0] for entry in entries]
+            for chunk in range(0, len(entry_ids), COMPACT_BATCH_SIZE):
+                BalanceEntry.objects.filter(
+                    id__in=entry_ids[chunk:chunk + COMPACT_BATCH_SIZE]
+                ).update(compacted_at=now)
+    logger.info(f"Compacted balance ledger: {len(user_ids)} users")
+    return len(user_ids)
+
+
+def with_ledger_balance(users: models.QuerySet) -> models.QuerySet:
+    """Баланс и баллы по журналу: снимок плюс несвёрнутые записи."""
+    tail = (
+        get_uncompacted_entries()
+        .filter(tg_user=OuterRef("id"))
+        .values("tg_user")
+        .order_by()
+    )
+    decimal = models.DecimalField(max_digits=10, decimal_places=2)
+    return users.annotate(
+        ledger_balance=Coalesce(
+            F("balance_snapshot__balance"), Value(Decimal(0)), output_field=decimal
+        )
+        + Coalesce(
+            Subquery(tail.annotate(total=Sum("amount")).values("total")),
+            Value(Decimal(0)),
+            output_field=decimal,
+        ),
+        ledger_points=Coalesce(F("balance_snapshot__points"), Value(0))
+        + Coalesce(
+            Subquery(tail.annotate(total=Sum("points")).values("total")), Value(0)
+        ),
+    )
+
+
+def reconcile_balances() -> list[BalanceMismatch]:
+    """Пользователи, у которых закэшированный баланс расходится с журналом."""
+    users = (
+        with_ledger_balance(TgUser.objects.all())
+        .exclude(balance=F("ledger_balance"), points=F("ledger_points"))
+        .values_list("id", "balance", "points", "ledger_balance", "ledger_points")
+    )
+    mismatches = [BalanceMismatch(*row) for row in users]
+    for mismatch in mismatches:
+        logger.warning(f"Balance ledger mismatch. {mismatch}")
+    return mismatches
+
+
+async def schedule_balance_compaction():
+    from .tasks import compact_balances_task
+
+    compact_balances_task.delay()
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from users.models import BalanceEntry, NegativeBalanceError, TgUser
+
+# Настоящих пользователей Telegram с таким id не бывает
+BENCH_TG_ID = 0
+
+
+def debit(user_id: int, amount: Decimal) -> bool:
+    try:
+        TgUser(id=user_id).process_payment(-amount, BalanceEntry.Reason.ORDER)
+        return True
+    except NegativeBalanceError:
+        return False
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест списаний: много параллельных покупок одного пользователя"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--purchases", type=int, default=2000)
+        parser.add_argument("--amount", type=Decimal, default=Decimal("1.00"))
+        parser.add_argument(
+            "--balance",
+            type=Decimal,
+            default=None,
+            help="Начальный баланс, по умолчанию хватает на половину покупок",
+        )
+
+    def handle(self, *args, **options):
+        amount = options["amount"]
+        purchases = options["purchases"]
+        balance = options["balance"]
+        if balance is None:
+            balance = amount * (purchases // 2)
+        if TgUser.objects.filter(tg_id=BENCH_TG_ID).exists():
+            raise CommandError(f"User with tg_id={BENCH_TG_ID} already exists")
+        user = TgUser.objects.create(tg_id=BENCH_TG_ID)
+        try:
+            self.run_bench(user, balance, amount, purchases, options["workers"])
+        finally:
+            user.delete()
+
+    def run_bench(self, user, balance, amount, purchases, workers):
+        user.apply_balance_change(balance, BalanceEntry.Reason.OPENING)
+        self.stdout.write(
+            f"{purchases} purchases of {amount} by {workers} workers, "
+            f"balance {balance}..."
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(debit, [user.id] * purchases, [amount] * purchases))
+        elapsed = time.perf_counter() - started
+        user.refresh_from_db()
+        succeeded = sum(results)
+        expected = balance - amount * succeeded
+        self.stdout.write(
+            f"Done in {elapsed:.2f}s ({purchases / elapsed:.0f} purchases/s): "
+            f"{succeeded} succeeded, {purchases - succeeded} rejected, "
+            f"final balance {user.balance}"
+        )
+        if user.balance != expected or user.balance < 0:
+            self.stdout.write(self.style.ERROR(f"Balance mismatch: expected {expected}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Balance is consistent."))
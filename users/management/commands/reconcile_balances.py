@@ -0,0 +1,24 @@
+from django.core.management import BaseCommand
+
+from users.ledger import compact_balances, reconcile_balances
+
+
+class Command(BaseCommand):
+    help = "Сверяет балансы пользователей с журналом изменений баланса"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compact", action="store_true", help="Сначала свернуть журнал в снимки"
+        )
+
+    def handle(self, *args, **options):
+        if options["compact"]:
+            count = compact_balances()
+            self.stdout.write(f"Compacted {count} user snapshots.")
+        mismatches = reconcile_balances()
+        for mismatch in mismatches:
+            self.stdout.write(self.style.ERROR(str(mismatch)))
+        if mismatches:
+            self.stdout.write(f"{len(mismatches)} users do not match the ledger.")
+        else:
+            self.stdout.write(self.style.SUCCESS("All balances match the ledger."))
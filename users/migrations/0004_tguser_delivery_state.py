@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-19 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_tguser_first_name_alter_tguser_last_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tguser',
+            name='delivery_failed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Last delivery failure'),
+        ),
+        migrations.AddField(
+            model_name='tguser',
+            name='delivery_state',
+            field=models.CharField(choices=[('active', 'Active'), ('blocked', 'Blocked the bot'), ('deactivated', 'Account deleted')], db_index=True, default='active', max_length=20, verbose_name='Delivery state'),
+        ),
+    ]
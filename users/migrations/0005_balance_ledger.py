@@ -0,0 +1,84 @@
+# Generated by Django 5.1 on 2026-10-19 05:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_opening_entries(apps, schema_editor):
+    TgUser = apps.get_model('users', 'TgUser')
+    BalanceEntry = apps.get_model('users', 'BalanceEntry')
+    BalanceSnapshot = apps.get_model('users', 'BalanceSnapshot')
+    BalanceSnapshot.objects.bulk_create(
+        (
+            BalanceSnapshot(tg_user_id=tg_user_id)
+            for tg_user_id in TgUser.objects.values_list('id', flat=True).iterator(
+                chunk_size=1000
+            )
+        ),
+        batch_size=1000,
+    )
+    users = (
+        TgUser.objects.exclude(balance=0, points=0)
+        .values_list('id', 'balance', 'points')
+        .iterator(chunk_size=1000)
+    )
+    BalanceEntry.objects.bulk_create(
+        (
+            BalanceEntry(
+                tg_user_id=tg_user_id,
+                reason='opening',
+                amount=balance,
+                points=points,
+                balance_after=balance,
+            )
+            for tg_user_id, balance, points in users
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_order_status_created_idx'),
+        ('users', '0004_tguser_delivery_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Balance')),
+                ('points', models.IntegerField(default=0, verbose_name='Points')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updation date')),
+                ('tg_user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshot', to='users.tguser', verbose_name='TG USER')),
+            ],
+            options={
+                'verbose_name': 'Balance snapshot',
+                'verbose_name_plural': 'Balance snapshots',
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('opening', 'Opening balance'), ('order', 'Order'), ('refund', 'Refund'), ('topup', 'Top up'), ('redeem', 'Points redemption'), ('adjustment', 'Manual adjustment')], max_length=20, verbose_name='Reason')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Amount')),
+                ('points', models.IntegerField(default=0, verbose_name='Points')),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Balance after')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creation date')),
+                ('compacted_at', models.DateTimeField(blank=True, null=True, verbose_name='Compacted at')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='balance_entries', to='orders.order', verbose_name='Order')),
+                ('tg_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_entries', to='users.tguser', verbose_name='TG USER')),
+                ('topup', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='balance_entries', to='orders.topup', verbose_name='TopUp')),
+            ],
+            options={
+                'verbose_name': 'Balance entry',
+                'verbose_name_plural': 'Balance entries',
+                'ordering': ('-id',),
+                'indexes': [models.Index(fields=['tg_user', '-id'], name='balance_entry_user_idx'), models.Index(condition=models.Q(('compacted_at__isnull', True)), fields=['tg_user'], name='balance_entry_uncompacted_idx')],
+            },
+        ),
+        migrations.RunPython(create_opening_entries, migrations.RunPython.noop),
+    ]
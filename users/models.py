@@ -1,14 +1,26 @@
 from decimal import Decimal
 
 from asgiref.sync import sync_to_async
-from django.db import models, transaction
+from django.db import connection, models, transaction
+from django.utils import timezone
 
 from backend.config import FEATURES_CONFIG
 
 
+class NegativeBalanceError(ValueError):
+    """Списание увело бы баланс ниже нуля."""
+
+    pass
+
+
 class TgUser(models.Model):
     """Класс Пользователей ТГ."""
 
+    class DeliveryState(models.TextChoices):
+        ACTIVE = "active", "Active"
+        BLOCKED = "blocked", "Blocked the bot"
+        DEACTIVATED = "deactivated", "Account deleted"
+
     tg_id = models.PositiveBigIntegerField(
         unique=True,
         verbose_name="Telegram ID",
@@ -24,6 +36,16 @@ class TgUser(models.Model):
         max_length=255, blank=True, null=True, verbose_name="Last Name"
     )
     is_admin = models.BooleanField(default=False)
+    delivery_state = models.CharField(
+        max_length=20,
+        choices=DeliveryState,
+        default=DeliveryState.ACTIVE,
+        db_index=True,
+        verbose_name="Delivery state",
+    )
+    delivery_failed_at = models.DateTimeField(
+        blank=True, null=True, verbose_name="Last delivery failure"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updation date")
     balance = models.DecimalField(
@@ -44,38 +66,125 @@ class TgUser(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name}/{self.id}"
 
+    @classmethod
+    def mark_unreachable(cls, tg_ids: list[int], state: DeliveryState):
+        return cls.objects.filter(tg_id__in=tg_ids).update(
+            delivery_state=state, delivery_failed_at=timezone.now()
+        )
+
+    @classmethod
+    async def amark_unreachable(cls, tg_ids: list[int], state: DeliveryState):
+        return await sync_to_async(cls.mark_unreachable)(tg_ids, state)
+
+    @classmethod
+    async def amark_reachable(cls, tg_id: int):
+        return (
+            await cls.objects.filter(tg_id=tg_id)
+            .exclude(delivery_state=cls.DeliveryState.ACTIVE)
+            .aupdate(delivery_state=cls.DeliveryState.ACTIVE)
+        )
+
+    @classmethod
+    async def ais_unreachable(cls, tg_id: int) -> bool:
+        return (
+            await cls.objects.filter(tg_id=tg_id)
+            .exclude(delivery_state=cls.DeliveryState.ACTIVE)
+            .aexists()
+        )
+
+    @classmethod
+    def change_balance(
+        cls, user_id: int, amount: Decimal | int | float, points: int = 0
+    ) -> tuple[Decimal, int]:
+        """
+        Меняет баланс и баллы одним условным UPDATE без предварительной блокировки.
+        Списание проходит, только если баланс и баллы не уйдут ниже нуля.
+        Возвращает новые баланс и баллы. Запись в журнал делает вызывающий.
+        """
+        amount = Decimal(str(amount))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {cls._meta.db_table} "
+                "SET balance = balance + %s, points = points + %s, updated_at = %s "
+                "WHERE id = %s AND balance + %s >= 0 AND points + %s >= 0 "
+                "RETURNING balance, points",
+                [amount, points, timezone.now(), user_id, amount, points],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            raise NegativeBalanceError("Balance cant be less than zero")
+        balance, points = row
+        return Decimal(str(balance)).quantize(Decimal("0.01")), points
+
+    def apply_balance_change(
+        self,
+        amount: Decimal | int | float,
+        reason: str,
+        points: int = 0,
+        order=None,
+        topup=None,
+    ) -> Decimal:
+        """Меняет баланс и дописывает запись в журнал в одной транзакции."""
+        amount = Decimal(str(amount))
+        with transaction.atomic():
+            self.balance, self.points = self.change_balance(self.id, amount, points)
+            BalanceEntry.objects.create(
+                tg_user=self,
+                reason=reason,
+                amount=amount,
+                points=points,
+                balance_after=self.balance,
+                order=order,
+                topup=topup,
+            )
+        return self.balance
+
     def redeem_points(self):
         if not FEATURES_CONFIG.POINTS_SYSTEM_ENABLED:
             return False
         if self.points < self.POINTS_RATIO:
             return False
-        with transaction.atomic():
-            tg_user = TgUser.objects.select_for_update().get(id=self.id)
-            balance_redeem = tg_user.points // tg_user.POINTS_RATIO
-            points_to_return = tg_user.points % tg_user.POINTS_RATIO
-            tg_user.balance += balance_redeem
-            tg_user.points = points_to_return
-            tg_user.save()
-            return True
+        # Баллы, начисленные параллельно, просто останутся в остатке
+        points = TgUser.objects.values_list("points", flat=True).get(id=self.id)
+        balance_redeem = points // self.POINTS_RATIO
+        if not balance_redeem:
+            return False
+        try:
+            self.apply_balance_change(
+                balance_redeem,
+                BalanceEntry.Reason.REDEEM,
+                points=-balance_redeem * self.POINTS_RATIO,
+            )
+        except NegativeBalanceError:
+            return False
+        return True
 
     async def aredeem_points(self):
         return await sync_to_async(self.redeem_points)()
 
-    def process_payment(self, amount: Decimal | int | float):
-        with transaction.atomic():
-            tg_user = TgUser.objects.select_for_update().get(id=self.id)
-            tg_user.balance += amount
-            if tg_user.balance < 0:
-                raise ValueError("Balance cant be less than zero")
-            tg_user.save()
-            if amount < 0:
-                if FEATURES_CONFIG.POINTS_SYSTEM_ENABLED:
-                    new_points = -amount
-                    tg_user.points += new_points
-                    tg_user.save(update_fields=("points",))
-
-    async def aprocess_payment(self, amount: Decimal | int | float):
-        return await sync_to_async(self.process_payment)(amount)
+    @staticmethod
+    def get_earned_points(amount: Decimal | int | float) -> int:
+        """Баллы начисляются за списания, если система баллов включена."""
+        if amount < 0 and FEATURES_CONFIG.POINTS_SYSTEM_ENABLED:
+            return int(-amount)
+        return 0
+
+    def process_payment(
+        self, amount: Decimal | int | float, reason: str, order=None, topup=None
+    ) -> Decimal:
+        """Зачисляет (amount > 0) или списывает (amount < 0) баланс, возвращает новый."""
+        return self.apply_balance_change(
+            amount,
+            reason,
+            points=self.get_earned_points(amount),
+            order=order,
+            topup=topup,
+        )
+
+    async def aprocess_payment(
+        self, amount: Decimal | int | float, reason: str, order=None, topup=None
+    ) -> Decimal:
+        return await sync_to_async(self.process_payment)(amount, reason, order, topup)
 
     def get_or_generate_api_key(self):
         from api.models import APIKey
@@ -95,3 +204,92 @@ class TgUser(models.Model):
 
     async def aregenerate_api_key(self):
         return await sync_to_async(self.regenerate_api_key)()
+
+
+class BalanceEntry(models.Model):
+    """
+    Журнал изменений баланса: записи только добавляются.
+    TgUser.balance остаётся кэшем, который сверяется с журналом.
+    """
+
+    class Reason(models.TextChoices):
+        OPENING = "opening", "Opening balance"
+        ORDER = "order", "Order"
+        REFUND = "refund", "Refund"
+        TOPUP = "topup", "Top up"
+        REDEEM = "redeem", "Points redemption"
+        ADJUSTMENT = "adjustment", "Manual adjustment"
+
+    tg_user = models.ForeignKey(
+        TgUser,
+        on_delete=models.CASCADE,
+        related_name="balance_entries",
+        verbose_name="TG USER",
+    )
+    reason = models.CharField(max_length=20, choices=Reason, verbose_name="Reason")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Amount")
+    points = models.IntegerField(default=0, verbose_name="Points")
+    balance_after = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Balance after"
+    )
+    order = models.ForeignKey(
+        "orders.Order",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="balance_entries",
+        verbose_name="Order",
+    )
+    topup = models.ForeignKey(
+        "orders.TopUp",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="balance_entries",
+        verbose_name="TopUp",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
+    compacted_at = models.DateTimeField(
+        blank=True, null=True, verbose_name="Compacted at"
+    )
+
+    class Meta:
+        verbose_name = "Balance entry"
+        verbose_name_plural = "Balance entries"
+        ordering = ("-id",)
+        indexes = [
+            models.Index(
+                fields=("tg_user", "-id"), name="balance_entry_user_idx"
+            ),
+            models.Index(
+                fields=("tg_user",),
+                condition=models.Q(compacted_at__isnull=True),
+                name="balance_entry_uncompacted_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tg_user_id}: {self.amount:+}$ ({self.reason})"
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Свёрнутая сумма записей журнала пользователя, отмеченных compacted_at.
+    Снимок есть у каждого пользователя и создаётся вместе с ним.
+    """
+
+    tg_user = models.OneToOneField(
+        TgUser,
+        on_delete=models.CASCADE,
+        related_name="balance_snapshot",
+        verbose_name="TG USER",
+    )
+    balance = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, verbose_name="Balance"
+    )
+    points = models.IntegerField(default=0, verbose_name="Points")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updation date")
+
+    class Meta:
+        verbose_name = "Balance snapshot"
+        verbose_name_plural = "Balance snapshots"
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import BalanceSnapshot, TgUser
+
+
+@receiver(post_save, sender=TgUser)
+def tguser_post_save(sender, instance: TgUser, created, **kwargs):
+    if created:
+        BalanceSnapshot.objects.get_or_create(tg_user=instance)
@@ -0,0 +1,15 @@
+import logging
+
+from backend.celery import app
+
+logger = logging.getLogger(__name__)
+
+
+@app.task()
+def compact_balances_task():
+    """Сворачивает журнал балансов в снимки и сверяет их с балансами пользователей."""
+    from .ledger import compact_balances, reconcile_balances
+
+    compact_balances()
+    if mismatches := reconcile_balances():
+        logger.warning(f"Balance ledger has {len(mismatches)} mismatched users")
@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import skipIf
+
+from django.contrib.admin.sites import AdminSite
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase
+
+from .admin import TgUserAdmin
+from .ledger import compact_balances, reconcile_balances
+from .management.commands.bench_balance import debit
+from .models import BalanceEntry, BalanceSnapshot, TgUser
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite locks whole tables on write")
+class ConcurrentDebitTests(TransactionTestCase):
+    def test_parallel_debits_never_overdraw(self):
+        user = TgUser.objects.create(tg_id=1)
+        user.apply_balance_change(Decimal("10.00"), BalanceEntry.Reason.OPENING)
+        purchases = 40
+        with ThreadPoolExecutor(8) as executor:
+            results = list(
+                executor.map(debit, [user.id] * purchases, [Decimal("1.00")] * purchases)
+            )
+        user.refresh_from_db()
+        self.assertEqual(sum(results), 10)
+        self.assertEqual(user.balance, Decimal("0.00"))
+        self.assertEqual(
+            user.balance_entries.filter(reason=BalanceEntry.Reason.ORDER).count(), 10
+        )
+
+
+class BalanceLedgerTests(TestCase):
+    def setUp(self):
+        self.user = TgUser.objects.create(tg_id=1)
+        self.user.apply_balance_change(Decimal("10.00"), BalanceEntry.Reason.TOPUP)
+        self.user.apply_balance_change(
+            Decimal("-3.00"), BalanceEntry.Reason.ORDER, points=2
+        )
+
+    def test_compaction_folds_entries_into_snapshot(self):
+        self.assertEqual(compact_balances(), 1)
+        snapshot = BalanceSnapshot.objects.get(tg_user=self.user)
+        self.assertEqual(snapshot.balance, Decimal("7.00"))
+        self.assertEqual(snapshot.points, 2)
+        self.assertFalse(
+            self.user.balance_entries.filter(compacted_at__isnull=True).exists()
+        )
+        # Свёрнутые записи второй раз не учитываются
+        self.assertEqual(compact_balances(), 0)
+        self.assertEqual(reconcile_balances(), [])
+
+    def test_reconcile_reports_cached_balance_drift(self):
+        compact_balances()
+        self.user.apply_balance_change(Decimal("1.00"), BalanceEntry.Reason.REFUND)
+        TgUser.objects.filter(id=self.user.id).update(balance=Decimal("99.00"))
+        [mismatch] = reconcile_balances()
+        self.assertEqual(mismatch.tg_user_id, self.user.id)
+        self.assertEqual(mismatch.balance, Decimal("99.00"))
+        # Снимок плюс несвёрнутая запись
+        self.assertEqual(mismatch.ledger_balance, Decimal("8.00"))
+
+
+class TgUserAdminTests(TestCase):
+    def setUp(self):
+        self.user = TgUser.objects.create(tg_id=1)
+        self.user.apply_balance_change(Decimal("10.00"), BalanceEntry.Reason.TOPUP)
+        self.admin = TgUserAdmin(TgUser, AdminSite())
+        self.request = RequestFactory().post("/")
+
+    def save_stale_form(self, changed: dict):
+        """Сохраняет форму, открытую до списания, которое прошло параллельно."""
+        obj = TgUser.objects.get(id=self.user.id)
+        initial = {"balance": obj.balance, "points": obj.points, "is_admin": False}
+        self.user.apply_balance_change(Decimal("-4.00"), BalanceEntry.Reason.ORDER)
+        for field, value in changed.items():
+            setattr(obj, field, value)
+        form = SimpleNamespace(changed_data=list(changed), initial=initial)
+        self.admin.save_model(self.request, obj, form, change=True)
+        return obj
+
+    def test_other_fields_do_not_undo_concurrent_debit(self):
+        obj = self.save_stale_form({"is_admin": True})
+        self.assertEqual(obj.balance, Decimal("6.00"))
+        self.assertTrue(TgUser.objects.get(id=self.user.id).is_admin)
+        self.assertFalse(
+            self.user.balance_entries.filter(
+                reason=BalanceEntry.Reason.ADJUSTMENT
+            ).exists()
+        )
+
+    def test_balance_edit_is_booked_as_delta_from_form(self):
+        obj = self.save_stale_form({"balance": Decimal("15.00")})
+        adjustment = self.user.balance_entries.get(
+            reason=BalanceEntry.Reason.ADJUSTMENT
+        )
+        self.assertEqual(adjustment.amount, Decimal("5.00"))
+        self.assertEqual(obj.balance, Decimal("11.00"))
+        self.assertEqual(reconcile_balances(), [])